@@ -1,23 +1,22 @@
-import json
 from pathlib import Path
+from operator import attrgetter
+
+from scan_folder import list_json, scan_files
 
 # folder = Path('2026010502')
 base_dir = Path(__file__).parent
 output_dir = base_dir / "Crawled"
-date_folders = sorted([d for d in output_dir.glob('[0-9]*') if d.is_dir()])
-folder = date_folders[-1]
+# 只需要最新的日期目录，直接取最大值而不是整体排序
+folder = max(d for d in output_dir.glob('[0-9]*') if d.is_dir())
 no_data_files = []
 total_files = 0
 
-for json_file in sorted(folder.glob('*.json')):
+entries = sorted(list_json(folder), key=attrgetter('name'))
+records = scan_files(folder, entries)
+for name in (entry.name for entry in entries):
     total_files += 1
-    try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            if data.get('message') == 'no nowcast data now.':
-                no_data_files.append(json_file.name)
-    except:
-        pass
+    if records[name]['is_no_data']:
+        no_data_files.append(name)
 
 print(f'总文件数: {total_files}')
 print(f'无数据文件数: {len(no_data_files)}')
@@ -1,35 +1,40 @@
-import json
 from pathlib import Path
 from collections import Counter
+from operator import attrgetter
+
+from scan_folder import list_json, scan_files
 
 # folder = Path('2026010502')
 base_dir = Path(__file__).parent
 output_dir = base_dir / "Crawled"
-date_folders = sorted([d for d in output_dir.glob('[0-9]*') if d.is_dir()])
-folder = date_folders[-1]
-type_counts = Counter()
+# 只需要最新的日期目录，直接取最大值而不是整体排序
+folder = max(d for d in output_dir.glob('[0-9]*') if d.is_dir())
+types = []
 robot_files = []
 null_files = []
 other_files = []
 
-for json_file in sorted(folder.glob('*.json')):
-    try:
-        with open(json_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            type_val = data.get('type')
-            type_counts[str(type_val)] += 1
-            
-            if type_val == 'robot':
-                robot_files.append(json_file.name)
-            elif type_val is None:
-                null_files.append(json_file.name)
-            else:
-                other_files.append((json_file.name, type_val))
-    except:
-        pass
+entries = sorted(list_json(folder), key=attrgetter('name'))
+records = scan_files(folder, entries)
+for name in (entry.name for entry in entries):
+    record = records[name]
+    # 无法解析的文件不计入统计
+    if not record['valid']:
+        continue
+    type_val = record['type']
+    types.append(str(type_val))
+    
+    if type_val == 'robot':
+        robot_files.append(name)
+    elif type_val is None:
+        null_files.append(name)
+    else:
+        other_files.append((name, type_val))
 
+# 一次性计数（Counter对可迭代对象的计数走C实现）
+type_counts = Counter(types)
 print('=== Type 分布统计 ===')
-for type_val, count in sorted(type_counts.items(), key=lambda x: -x[1]):
+for type_val, count in type_counts.most_common():
     print(f'{type_val}: {count}')
 
 print(f'\n=== type: robot 的文件 ({len(robot_files)}) ===')
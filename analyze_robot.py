@@ -1,66 +1,26 @@
 import json
-import os
-import re
-from datetime import datetime
+from bisect import bisect_left
 from collections import Counter
 
-folder_path = r"q:\Google_nowcast\Crawled\2026010600"
-
-# 获取所有json文件
-json_files = [f for f in os.listdir(folder_path) if f.endswith('.json')]
+from scan_folder import load_timeline
 
-# 提取时间戳并排序
-file_data = []
-for filename in json_files:
-    # 从文件名中提取时间戳
-    # 可能的格式: 
-    # nowcast_xxx_20260106_xxxxxx.json (有下划线)
-    # nowcast_xxx_20260106xxxxxx.json (无下划线)
-    
-    # 使用两种方式提取
-    timestamp = None
-    
-    # 方式1: 8位日期_6位时间 (YYYYMMDD_HHMMSS)
-    match1 = re.search(r'(\d{8})_(\d{6})', filename)
-    if match1:
-        try:
-            timestamp_str = match1.group(1) + match1.group(2)
-            timestamp = datetime.strptime(timestamp_str, "%Y%m%d%H%M%S")
-        except:
-            pass
-    
-    # 方式2: 14位连续时间戳 (YYYYMMDDHHMMSS)
-    if not timestamp:
-        match2 = re.search(r'(\d{14})', filename)
-        if match2:
-            try:
-                timestamp_str = match2.group(1)
-                timestamp = datetime.strptime(timestamp_str, "%Y%m%d%H%M%S")
-            except:
-                pass
-    
-    if timestamp:
-        file_data.append((filename, timestamp))
+folder_path = r"q:\Google_nowcast\Crawled\2026010600"
 
-# 按时间排序
-file_data.sort(key=lambda x: x[1])
+# 列出json文件、从文件名提取时间戳并按时间排序，同时读取每个文件的扫描结果（未变化的文件直接取缓存）
+file_data, records = load_timeline(folder_path)
 
 print(f"总文件数: {len(file_data)}")
 print("\n按时间排序的文件:")
 
+robot_flags = [records[filename]['has_robot'] for filename, _ in file_data]
+
 # 检查每个文件中是否包含"robot"
 robot_appearances = []
 
-for idx, (filename, timestamp) in enumerate(file_data):
-    filepath = os.path.join(folder_path, filename)
-    try:
-        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            if 'robot' in content.lower():
-                robot_appearances.append((idx, filename, timestamp))
-                print(f"✓ {idx+1:3d}. {timestamp} - {filename}")
-    except:
-        pass
+for idx, ((filename, timestamp), robot) in enumerate(zip(file_data, robot_flags)):
+    if robot:
+        robot_appearances.append((idx, filename, timestamp))
+        print(f"✓ {idx+1:3d}. {timestamp} - {filename}")
 
 print("\n" + "="*80)
 print("分析结果:")
@@ -123,7 +83,8 @@ if robot_appearances:
         for i in range(0, len(file_data), max(1, int(threshold))):
             window_end = min(i + int(threshold), len(file_data))
             window_files = file_data[i:window_end]
-            window_robot_count = sum(1 for idx, _, _ in robot_appearances if i <= idx < window_end)
+            # robot_indices有序，二分查找窗口边界即可计数
+            window_robot_count = bisect_left(robot_indices, window_end) - bisect_left(robot_indices, i)
             
             if window_robot_count > 0:
                 start_time = window_files[0][1]
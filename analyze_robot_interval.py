@@ -1,46 +1,21 @@
 import json
-import os
-import re
-from datetime import datetime, timedelta
+from operator import itemgetter
 
-folder_path = r"q:\Google_nowcast\Crawled\2026010607"
+from scan_folder import load_timeline
 
-# 获取所有json文件
-json_files = [f for f in os.listdir(folder_path) if f.endswith('.json')]
+folder_path = r"q:\Google_nowcast\Crawled\2026010607"
 
-# 提取时间戳并排序
-file_data = []
-for filename in json_files:
-    # 只处理包含真实日期 20260106 的文件
-    if '20260106' not in filename:
-        continue
-    
-    # 找出20260106后面的6位数字
-    match = re.search(r'20260106[_]?(\d{6})', filename)
-    if match:
-        time_str = match.group(1)
-        timestamp_str = f"20260106{time_str}"
-        try:
-            timestamp = datetime.strptime(timestamp_str, "%Y%m%d%H%M%S")
-            file_data.append((filename, timestamp))
-        except:
-            pass
+# 列出json文件、从文件名提取时间戳并按时间排序，同时读取每个文件的扫描结果（未变化的文件直接取缓存）
+file_data, records = load_timeline(folder_path, date='20260106')
 
-# 按时间排序
-file_data.sort(key=lambda x: x[1])
+robot_flags = [records[filename]['has_robot'] for filename, _ in file_data]
 
 # 检查每个文件中是否包含"robot"
 robot_files = []
 
-for filename, timestamp in file_data:
-    filepath = os.path.join(folder_path, filename)
-    try:
-        with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            if 'robot' in content.lower():
-                robot_files.append((filename, timestamp))
-    except:
-        pass
+for (filename, timestamp), robot in zip(file_data, robot_flags):
+    if robot:
+        robot_files.append((filename, timestamp))
 
 print(f"总文件数: {len(file_data)}")
 print(f"包含robot的文件数: {len(robot_files)}")
@@ -98,8 +73,8 @@ if len(robot_files) > 1:
         print(f"   {label:<15}: {count:>3} 对 ({percentage:>5.1f}%)")
     
     # 最小、最大、平均间隔
-    min_interval = min(intervals, key=lambda x: x['interval_minutes'])
-    max_interval = max(intervals, key=lambda x: x['interval_minutes'])
+    min_interval = min(intervals, key=itemgetter('interval_minutes'))
+    max_interval = max(intervals, key=itemgetter('interval_minutes'))
     avg_interval = sum(x['interval_minutes'] for x in intervals) / len(intervals)
     
     print(f"\n4. 间隔统计指标:")
@@ -18,11 +18,24 @@ if sys.platform == 'win32':
 
 from datetime import datetime
 import time
-import pandas as pd
-import re
+import csv
+from itertools import zip_longest
+from urllib.parse import quote_plus
 import json
+import shutil
+import tempfile
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 print("\n" + "="*60)
 print("爬取Google未来24小时天气预报数据 - 单个城市 (移动端)")
 print("="*60)
@@ -45,6 +58,150 @@ except ImportError as import_err:
     exit(1)
 
 
+def dump_json(obj):
+    """序列化为缩进的UTF-8 JSON字节（优先用orjson，未安装时回退到标准库json）"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+# 已解析的chromedriver路径，同一进程内只调用一次ChromeDriverManager().install()
+_DRIVER_PATH = None
+
+
+def _driver_binary():
+    """返回chromedriver路径（首次调用时安装/解析并缓存）"""
+    global _DRIVER_PATH
+    if _DRIVER_PATH is None:
+        _DRIVER_PATH = ChromeDriverManager().install()
+    return _DRIVER_PATH
+
+
+# 持久化的Chrome用户数据目录（与nowcast爬虫的各工作线程目录分开，避免profile锁冲突）
+PROFILE_DIR = Path.home() / '.cache' / 'nowcast_profile' / 'mobile_hourly'
+PROFILE_LOCK = PROFILE_DIR.with_name('mobile_hourly.lock')
+
+
+def _claim_profile():
+    """
+    返回 (profile_dir, lock_file, is_temp)
+    
+    用文件锁独占持久化目录；锁已被其他运行（其他进程或并行的城市）持有、
+    或平台没有 fcntl 时，改用一次性的临时目录，避免 Chrome 报
+    "user data directory is already in use"
+    """
+    if fcntl is not None:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        lock_file = open(PROFILE_LOCK, 'w')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return PROFILE_DIR, lock_file, False
+        except OSError:
+            lock_file.close()
+    return Path(tempfile.mkdtemp(prefix='nowcast_mobile_')), None, True
+
+
+def _release_profile(profile_dir, lock_file, is_temp):
+    if lock_file is not None:
+        lock_file.close()  # 关闭文件即释放 flock
+    if is_temp:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+# 减少页面加载流量的Chrome内容设置和启动参数
+LIGHTWEIGHT_PREFS = {
+    'profile.managed_default_content_settings.images': 2,
+    'profile.managed_default_content_settings.plugins': 2,
+    'profile.managed_default_content_settings.popups': 2,
+    'profile.managed_default_content_settings.notifications': 2,
+}
+LIGHTWEIGHT_ARGS = (
+    '--blink-settings=imagesEnabled=false',
+    '--disable-extensions',
+    '--disable-gpu',
+    '--disable-background-networking',
+    '--disable-sync',
+    '--mute-audio',
+)
+
+# 爬取不需要的请求（gstatic脚本负责渲染天气组件，不能屏蔽）
+BLOCKED_URL_PATTERNS = (
+    '*doubleclick*',
+    '*adservice*',
+    '*googlesyndication*',
+    '*google-analytics*',
+    '*googletagmanager*',
+    '*gstatic*/images/*',
+    '*.gif',
+    '*.webp',
+    '*.png',
+    '*.jpg',
+    '*.woff2',
+)
+
+# 页面脚本执行前注入：隐藏navigator.webdriver，让Web Animations立即结束（仍返回真实的
+# Animation对象，finish回调照常触发），requestIdleCallback的任务立即执行
+NEW_DOCUMENT_JS = """
+(() => {
+    Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+    const animate = Element.prototype.animate;
+    if (animate) {
+        Element.prototype.animate = function (...args) {
+            const anim = animate.apply(this, args);
+            try { anim.finish(); } catch (e) {}
+            return anim;
+        };
+    }
+    window.requestIdleCallback = (cb) => setTimeout(() => cb({didTimeout: false, timeRemaining: () => 50}), 0);
+    window.cancelIdleCallback = (id) => clearTimeout(id);
+})();
+"""
+
+# 逐小时列表是否已渲染出带aria-label的列表项
+HOURLY_READY_JS = "return !!document.querySelector('[jsname=\"s2gQvd\"] [role=\"listitem\"][aria-label]');"
+# 时间和aria-label的合并提取脚本，一次execute_script返回 {time, aria_labels, aria_count}
+FORECAST_EXTRACT_JS = r"""
+const times = [];
+const timeContainer = document.getElementById('wob_sd');
+if (timeContainer) {
+  const seen = new Set();
+  const timeRe = /^\d{1,2}\s*[AP]M$/;
+  const hiddenStyle = /display\s*:\s*none|visibility\s*:\s*hidden|opacity\s*:\s*0(?![.\d])/i;
+  // TreeWalker逐个产出span，不构建完整的NodeList
+  const walker = document.createTreeWalker(timeContainer, NodeFilter.SHOW_ELEMENT, {
+    acceptNode: n => n.tagName === 'SPAN' ? NodeFilter.FILTER_ACCEPT : NodeFilter.FILTER_SKIP
+  });
+  let s;
+  while ((s = walker.nextNode())) {
+    // 先用文本和内联样式做廉价过滤，只有时间格式的span才计算样式和尺寸
+    const txt = (s.textContent || '').trim().toUpperCase();
+    if (!txt || !timeRe.test(txt)) continue;
+    const normalized = txt.replace(/\s+/g, ' ');
+    if (seen.has(txt) || seen.has(normalized)) continue;
+    if (hiddenStyle.test(s.getAttribute('style') || '')) continue;
+    const cs = window.getComputedStyle(s);
+    if (cs.display === 'none' || cs.visibility === 'hidden' || cs.opacity === '0') continue;
+    const rect = s.getBoundingClientRect();
+    if (rect.width === 0 || rect.height === 0) continue;
+    times.push(normalized);
+    seen.add(normalized);
+  }
+}
+
+let ariaLabels = [];
+let ariaCount = 0;
+const ariaContainer = document.querySelector('[jsname="s2gQvd"].EDblX.HG5ZQb');
+if (ariaContainer) {
+  // 选择器在引擎内部完成属性匹配，直接映射出aria-label
+  const items = ariaContainer.querySelectorAll('[role="listitem"][aria-label]');
+  ariaCount = items.length;
+  ariaLabels = Array.from(items, item => item.getAttribute('aria-label')).filter(Boolean);
+}
+return {time: times, aria_labels: ariaLabels, aria_count: ariaCount};
+"""
+# 将逐小时列表滚动到视野中部
+SCROLL_HOURLY_JS = "document.querySelector('[jsname=\"s2gQvd\"]')?.scrollIntoView({block: 'center'});"
+
+
 def scrape_24h_forecast(city_name, headless=True, save_json=False, save_csv=True, output_dir=None):
     """
     爬取Google搜索中的未来24小时天气预报数据
@@ -59,6 +216,8 @@ def scrape_24h_forecast(city_name, headless=True, save_json=False, save_csv=True
     else:
         output_dir = Path(output_dir)
     
+    driver = None
+    profile = None
     try:
         print(f"\n正在爬取 {city_name} 的未来24小时预报...")
         print(f"  浏览器模式: {'无头' if headless else '显示'}")
@@ -86,6 +245,15 @@ def scrape_24h_forecast(city_name, headless=True, save_json=False, save_csv=True
         options.add_experimental_option('useAutomationExtension', False)
         options.add_argument('--lang=en-US')
         
+        # 持久化用户数据目录：同意弹窗的cookie和HTTP缓存在多次运行间复用（被占用时用临时目录）
+        profile = _claim_profile()
+        options.add_argument(f'--user-data-dir={profile[0]}')
+        
+        # 只读取DOM文本和属性：禁用图片、插件、弹窗及后台网络请求（保留样式表，可见性判断依赖它）
+        options.add_experimental_option('prefs', LIGHTWEIGHT_PREFS)
+        for arg in LIGHTWEIGHT_ARGS:
+            options.add_argument(arg)
+        
         # 移动设备模拟
         mobile_emulation = {"deviceName": "Nexus 5"}
         options.add_experimental_option("mobileEmulation", mobile_emulation)
@@ -95,14 +263,20 @@ def scrape_24h_forecast(city_name, headless=True, save_json=False, save_csv=True
         
         # 初始化WebDriver
         print("  正在初始化WebDriver...")
-        service = Service(ChromeDriverManager().install())
+        service = Service(_driver_binary())
         driver = webdriver.Chrome(service=service, options=options)
         print("  ✓ WebDriver已初始化")
         
         try:
-            driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-                'source': 'Object.defineProperty(navigator, "webdriver", {get: () => undefined});'
-            })
+            driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': NEW_DOCUMENT_JS})
+        except Exception:
+            pass
+        
+        # 通过CDP在网络层屏蔽广告/统计/图片/字体请求（不同Chrome版本CDP接口可能不同，失败则忽略）
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': list(BLOCKED_URL_PATTERNS)})
+            driver.execute_cdp_cmd('Page.setDownloadBehavior', {'behavior': 'deny'})
         except Exception:
             pass
         
@@ -111,13 +285,20 @@ def scrape_24h_forecast(city_name, headless=True, save_json=False, save_csv=True
         driver.get('https://www.google.com/ncr?hl=en&gl=us')
         
         # 处理同意弹窗
+        def wait_gone(element):
+            """点击后等待按钮从页面移除，代替固定sleep"""
+            try:
+                WebDriverWait(driver, 3).until(EC.staleness_of(element))
+            except Exception:
+                pass
+
         def click_consent():
             try:
                 btn = WebDriverWait(driver, 5).until(
                     EC.element_to_be_clickable((By.ID, 'L2AGLb'))
                 )
                 btn.click()
-                time.sleep(0.5)
+                wait_gone(btn)
                 return True
             except Exception:
                 pass
@@ -125,7 +306,7 @@ def scrape_24h_forecast(city_name, headless=True, save_json=False, save_csv=True
                 candidates = driver.find_elements(By.XPATH, "//button//*[text()='Accept all']/..|//button//*[text()='I agree']/..")
                 if candidates:
                     candidates[0].click()
-                    time.sleep(0.5)
+                    wait_gone(candidates[0])
                     return True
             except Exception:
                 pass
@@ -155,10 +336,9 @@ def scrape_24h_forecast(city_name, headless=True, save_json=False, save_csv=True
             search_box.send_keys(f'weather in {city_name}')
             search_box.send_keys(Keys.RETURN)
         except Exception:
-            q = re.sub(r"\s+", "+", f"weather in {city_name}")
+            q = quote_plus(f"weather in {city_name}")
             driver.get(f'https://www.google.com/search?q={q}&hl=en&gl=us')
         
-        time.sleep(3)
         wait = WebDriverWait(driver, 20)
         
         # 等待天气widget加载
@@ -170,14 +350,10 @@ def scrape_24h_forecast(city_name, headless=True, save_json=False, save_csv=True
         
         print("  [3/3] 爬取未来24小时预报数据...")
 
-        # 等待渲染稳定
-        time.sleep(2)
-
-        # 轻微滚动以触发展示
+        # 将逐小时列表滚入视野以触发展示，并等待列表项渲染（不再固定sleep）
         try:
-            driver.execute_script("window.scrollBy(0, 300);")
-            time.sleep(0.5)
-            driver.execute_script("window.scrollBy(0, -200);")
+            driver.execute_script(SCROLL_HOURLY_JS)
+            WebDriverWait(driver, 5).until(lambda d: d.execute_script(HOURLY_READY_JS))
         except Exception:
             pass
         
@@ -189,86 +365,33 @@ def scrape_24h_forecast(city_name, headless=True, save_json=False, save_csv=True
             'aria_labels': []
         }
         
-        # === 爬取时间 ===
-        print("\n  [时间] 正在爬取...")
-        try:
-            time_result = driver.execute_script(
-                """
-                const container = document.getElementById('wob_sd');
-                if (!container) return [];
-                const spans = container.querySelectorAll('span');
-                const times = [];
-                const seen = new Set();
-                for (const s of spans) {
-                  const styleAttr = (s.getAttribute('style') || '').toLowerCase();
-                  if (styleAttr.includes('display:none') || styleAttr.includes('display: none')) continue;
-                  const cs = window.getComputedStyle(s);
-                  if (cs.display === 'none' || cs.visibility === 'hidden' || cs.opacity === '0') continue;
-                  const rect = s.getBoundingClientRect();
-                  if (rect.width === 0 || rect.height === 0) continue;
-                  const txt = (s.textContent || '').trim().toUpperCase();
-                  if (txt && /^\d{1,2}\s*[AP]M$/.test(txt) && !seen.has(txt)) {
-                    const normalized = txt.replace(/\s+/g, ' ');
-                    if (!seen.has(normalized)) {
-                      times.push(normalized);
-                      seen.add(normalized);
-                    }
-                  }
-                }
-                return times;
-                """
-            ) or []
-            
-            forecast_data['time'] = time_result
-            print(f"    ✓ 获取 {len(time_result)} 个时间点")
-            if time_result:
-                print(f"      样本: {time_result[:3]}")
-        except Exception as e:
-            print(f"    ✗ 无法获取时间: {str(e)[:80]}")
-        
-        # === 爬取 jsname="s2gQvd" class="EDblX HG5ZQb" 下的 aria-label ===
-        print("\n  [aria-label] 正在爬取...")
+        # === 一次round-trip同时爬取时间和 jsname="s2gQvd" class="EDblX HG5ZQb" 下的 aria-label ===
+        print("\n  [时间 / aria-label] 正在爬取...")
         try:
-            aria_result = None
+            extract_result = {}
             for attempt in range(1, 4):
-                aria_result = driver.execute_script(
-                    """
-                    const container = document.querySelector('[jsname="s2gQvd"].EDblX.HG5ZQb');
-                    if (!container) return { count: 0, labels: [] };
-                    const items = container.querySelectorAll('[role="listitem"][aria-label]');
-                    const labels = [];
-                    for (const item of items) {
-                        const ariaLabel = item.getAttribute('aria-label');
-                        if (ariaLabel) {
-                            labels.push(ariaLabel);
-                        }
-                    }
-                    return { count: items.length, labels: labels };
-                    """
-                ) or {}
-
-                if isinstance(aria_result, dict) and aria_result.get('labels'):
+                extract_result = driver.execute_script(FORECAST_EXTRACT_JS) or {}
+                if extract_result.get('aria_labels'):
                     break
 
-                # 若未抓到，尝试滚动并等待
-                driver.execute_script("window.scrollBy(0, 400);")
-                time.sleep(1)
-                driver.execute_script("window.scrollBy(0, -300);")
-                time.sleep(0.5)
-
-            if isinstance(aria_result, dict):
-                forecast_data['aria_labels'] = aria_result.get('labels', [])
-                print(f"    ✓ 获取 {aria_result.get('count', 0)} 个节点，aria-label 数量 {len(forecast_data['aria_labels'])}")
-                if forecast_data['aria_labels']:
-                    print(f"      样本: {forecast_data['aria_labels'][:3]}")
-            else:
-                # 兼容老返回格式
-                forecast_data['aria_labels'] = aria_result if isinstance(aria_result, list) else []
-                print(f"    ✓ 获取 {len(forecast_data['aria_labels'])} 个 aria-label")
-                if forecast_data['aria_labels']:
-                    print(f"      样本: {forecast_data['aria_labels'][:3]}")
+                # 若未抓到，重新滚入视野并等待列表项出现
+                try:
+                    driver.execute_script(SCROLL_HOURLY_JS)
+                    WebDriverWait(driver, 5).until(lambda d: d.execute_script(HOURLY_READY_JS))
+                except Exception:
+                    pass
+
+            forecast_data['time'] = extract_result.get('time', [])
+            print(f"    ✓ 获取 {len(forecast_data['time'])} 个时间点")
+            if forecast_data['time']:
+                print(f"      样本: {forecast_data['time'][:3]}")
+
+            forecast_data['aria_labels'] = extract_result.get('aria_labels', [])
+            print(f"    ✓ 获取 {extract_result.get('aria_count', 0)} 个节点，aria-label 数量 {len(forecast_data['aria_labels'])}")
+            if forecast_data['aria_labels']:
+                print(f"      样本: {forecast_data['aria_labels'][:3]}")
         except Exception as e:
-            print(f"    ✗ 无法获取 aria-label: {str(e)[:80]}")
+            print(f"    ✗ 无法获取时间/aria-label: {str(e)[:80]}")
 
         # 若未抓到核心数据，保存调试页面
         if not forecast_data['time'] or not forecast_data['aria_labels']:
@@ -276,6 +399,7 @@ def scrape_24h_forecast(city_name, headless=True, save_json=False, save_csv=True
             save_debug_html("nodata")
         
         driver.quit()
+        driver = None
         
         # 保存结果
         if save_json or save_csv:
@@ -285,15 +409,12 @@ def scrape_24h_forecast(city_name, headless=True, save_json=False, save_csv=True
 
             if save_json:
                 json_file = output_dir / f"{city_short}_24h_forecast_mobile_{ts}.json"
-                with open(json_file, 'w', encoding='utf-8') as f:
-                    json.dump(forecast_data, f, ensure_ascii=False, indent=2)
+                json_file.write_bytes(dump_json(forecast_data))
                 print(f"\n✓ 已保存JSON到 {json_file}")
 
             if save_csv:
-                df = create_forecast_dataframe(forecast_data)
-                if df is not None:
-                    csv_file = output_dir / f"{city_short}_24h_forecast_mobile_{ts}.csv"
-                    df.to_csv(csv_file, index=False, encoding='utf-8')
+                csv_file = output_dir / f"{city_short}_24h_forecast_mobile_{ts}.csv"
+                if write_forecast_csv(csv_file, forecast_data):
                     print(f"✓ 已保存CSV到 {csv_file}")
         
         # 显示摘要
@@ -312,32 +433,37 @@ def scrape_24h_forecast(city_name, headless=True, save_json=False, save_csv=True
         import traceback
         traceback.print_exc()
         return None
+    finally:
+        # 出错时也关闭浏览器，否则持久化目录一直被锁住
+        if driver is not None:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+        if profile is not None:
+            _release_profile(*profile)
 
 
-def create_forecast_dataframe(forecast_data):
+def write_forecast_csv(csv_file, forecast_data):
     """
-    将预报数据转换为DataFrame
+    将预报数据写入CSV（time, aria_label 两列），无aria-label数据时不写文件并返回False
     """
     if not forecast_data:
-        return None
+        return False
     
     times = forecast_data.get('time', [])
     aria_labels = forecast_data.get('aria_labels', [])
     
     if not aria_labels:
-        return None
-    
-    # 对齐长度
-    max_len = max(len(times), len(aria_labels))
-    times = times + [''] * (max_len - len(times))
-    aria_labels = aria_labels + [''] * (max_len - len(aria_labels))
+        return False
     
-    df = pd.DataFrame({
-        'time': times[:max_len],
-        'aria_label': aria_labels[:max_len]
-    })
+    with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['time', 'aria_label'])
+        # zip_longest逐行对齐两列，较短的一列补空字符串，无需构造补齐后的列表
+        writer.writerows(zip_longest(times, aria_labels, fillvalue=''))
     
-    return df
+    return True
 
 
 if __name__ == "__main__":
@@ -8,23 +8,226 @@ from datetime import datetime, timedelta, timezone
 from pathlib import Path
 import json
 import time
-import schedule
-import pandas as pd
+import random
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from urllib.parse import quote_plus
+import csv
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def _chrome_driver(headless: bool = True):
+
+# Content settings / switches that cut page-load bytes without touching the
+# DOM the scraper reads (stylesheets stay on: visibility and layout depend on them)
+LIGHTWEIGHT_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.managed_default_content_settings.plugins": 2,
+    "profile.managed_default_content_settings.popups": 2,
+    "profile.managed_default_content_settings.notifications": 2,
+}
+LIGHTWEIGHT_ARGS = (
+    "--blink-settings=imagesEnabled=false",
+    "--disable-extensions",
+    "--disable-gpu",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--mute-audio",
+)
+
+# Requests the scraper never needs; gstatic scripts are left alone because they render the widget
+BLOCKED_URL_PATTERNS = (
+    "*doubleclick*",
+    "*adservice*",
+    "*googlesyndication*",
+    "*google-analytics*",
+    "*googletagmanager*",
+    "*gstatic*/images/*",
+    "*.gif",
+    "*.webp",
+    "*.png",
+    "*.jpg",
+    "*.woff2",
+)
+
+# Runs before any page script: hide navigator.webdriver, finish Web Animations
+# immediately (real Animation objects, so finish handlers still fire) and run
+# requestIdleCallback work right away instead of waiting for idle periods
+NEW_DOCUMENT_JS = """
+(() => {
+    Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+    const animate = Element.prototype.animate;
+    if (animate) {
+        Element.prototype.animate = function (...args) {
+            const anim = animate.apply(this, args);
+            try { anim.finish(); } catch (e) {}
+            return anim;
+        };
+    }
+    window.requestIdleCallback = (cb) => setTimeout(() => cb({didTimeout: false, timeRemaining: () => 50}), 0);
+    window.cancelIdleCallback = (id) => clearTimeout(id);
+})();
+"""
+
+# JS expression, true on Google's robot check page. Probes the captcha nodes and
+# reads textContent, which (unlike innerText) does not force a layout flush
+ROBOT_CHECK_EXPR = """(
+    !!document.querySelector('form#captcha-form, #recaptcha, div.g-recaptcha, iframe[src*="recaptcha"]')
+    || /I'm not a robot|unusual traffic/.test(document.body ? document.body.textContent : '')
+)"""
+
+# True once the SVG, fallback div, hourly list or a robot check page is present
+PAGE_READY_JS = """
+return !!document.querySelector('svg[viewBox*="1440"], div[jsname="Kt2ahd"], [jsname="s2gQvd"] [role="listitem"]')
+    || """ + ROBOT_CHECK_EXPR + ";"
+
+
+# Resolved chromedriver path, shared by every driver this process starts
+_DRIVER_PATH: str | None = None
+_DRIVER_PATH_LOCK = threading.Lock()
+
+
+def _driver_binary() -> str:
+    """Resolve the chromedriver binary once per process (install() stats disk and may hit the network)."""
+    global _DRIVER_PATH
+    with _DRIVER_PATH_LOCK:
+        if _DRIVER_PATH is None:
+            from webdriver_manager.chrome import ChromeDriverManager
+            _DRIVER_PATH = ChromeDriverManager().install()
+        return _DRIVER_PATH
+
+
+# Fused extraction script, evaluated once per city. Checks in priority order and
+# returns {kind: 'robot' | 'nowcast' | 'fallback' | 'hourly' | 'none', ...}.
+EXTRACT_JS = """
+if (""" + ROBOT_CHECK_EXPR + """) {
+    return {kind: 'robot'};
+}
+
+// Target SVG: the first one with rects whose viewBox includes 1440 and 48
+for (const svg of document.querySelectorAll('svg')) {
+    const vb = svg.getAttribute('viewBox') || "";
+    if (!(vb.includes('1440') && vb.includes('48'))) continue;
+    const rects = svg.querySelectorAll('rect');
+    if (!rects.length) continue;
+    const rows = [];
+    for (let i = 0; i < rects.length; i++) {
+        const r = rects[i];
+        rows.push({
+            idx: i,
+            height: r.getAttribute('height') || '',
+            fill: r.getAttribute('fill') || '',
+            x: r.getAttribute('x') || '',
+            y: r.getAttribute('y') || '',
+            width: r.getAttribute('width') || ''
+        });
+    }
+    return {kind: 'nowcast', viewBox: vb, rects: rows};
+}
+
+// Fallback: div[jsname="Kt2ahd"].XhUg9e with the two summary divs
+const div = document.querySelector('div[jsname="Kt2ahd"].XhUg9e');
+if (div) {
+    const div1 = div.querySelector('.SnOHQb.tNxQIb');
+    const div2 = div.querySelector('.jz8NAf.ApHyTb');
+    if (div1 || div2) {
+        return {kind: 'fallback', data: {
+            div1_text: div1 ? div1.textContent.trim() : null,
+            div2_text: div2 ? div2.textContent.trim() : null
+        }};
+    }
+}
+
+// Third fallback: first six hourly forecast aria-labels
+const container = document.querySelector('[jsname="s2gQvd"].EDblX.HG5ZQb');
+if (!container) return {kind: 'none', reason: 'no_hourly_container'};
+const items = container.querySelectorAll('[role="listitem"][aria-label]');
+if (!items.length) return {kind: 'none', reason: 'no_hourly_items'};
+const labels = [];
+for (let i = 0; i < Math.min(6, items.length); i++) {
+    const ariaLabel = items[i].getAttribute('aria-label');
+    if (ariaLabel) labels.push(ariaLabel);
+}
+if (!labels.length) return {kind: 'none', reason: 'no_hourly_items'};
+return {kind: 'hourly', count: labels.length, labels: labels};
+"""
+
+
+def _dump_json(obj) -> bytes:
+    """Serialize to indented UTF-8 JSON; orjson when available, else the stdlib."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _save_output(out, base_dir, city_id, folder_date, file_timestamp):
+    """Write one scrape result to Crawled/<folder_date>/nowcast_<city_id>_<file_timestamp>.json."""
+    outdir = base_dir / "Crawled" / folder_date
+    outdir.mkdir(parents=True, exist_ok=True)
+    fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
+    fname.write_bytes(_dump_json(out))
+    print("Saved:", fname)
+    return fname
+
+
+@lru_cache(maxsize=None)
+def _search_url(city: str) -> str:
+    """Google weather search URL for a city (cached: the city list repeats every run)."""
+    return f"https://www.google.com/search?q={quote_plus(f'weather {city}')}&hl=en&gl=us"
+
+
+def _rects_to_points(rows, start):
+    """Turn the JS rect rows into output points, one per 2-minute step from start."""
+    step = timedelta(minutes=2)
+    points = []
+    for row in rows:
+        idx = int(row.get("idx", 0))
+        points.append({
+            "minute_index": idx,
+            "time": (start + step * idx).strftime("%Y-%m-%d %H:%M"),
+            "height": row.get("height"),
+            "fill": row.get("fill"),
+            "x": row.get("x"),
+            "y": row.get("y"),
+            "width": row.get("width")
+        })
+    return points
+
+
+def _block_heavy_requests(driver):
+    """Block ad/analytics/image/font URLs at the network layer via CDP (best effort)."""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(BLOCKED_URL_PATTERNS)})
+        driver.execute_cdp_cmd("Page.setDownloadBehavior", {"behavior": "deny"})
+    except Exception:
+        pass  # CDP surface differs between Chrome versions
+
+
+def _chrome_driver(headless: bool = True, profile_dir: str | Path | None = None):
+    """Start Chrome; with profile_dir the user-data-dir (cookies, HTTP cache) persists across runs."""
     from selenium import webdriver
-    from webdriver_manager.chrome import ChromeDriverManager
     from selenium.webdriver.chrome.service import Service
 
     options = webdriver.ChromeOptions()
     if headless:
         options.add_argument("--headless=new")
+    if profile_dir:
+        Path(profile_dir).mkdir(parents=True, exist_ok=True)
+        options.add_argument(f"--user-data-dir={profile_dir}")
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--disable-blink-features=AutomationControlled")
     options.add_experimental_option("excludeSwitches", ["enable-automation"]) 
     options.add_experimental_option("useAutomationExtension", False)
+    # The scraper only reads DOM text/attributes: skip images, plugins, popups and background traffic
+    options.add_experimental_option("prefs", LIGHTWEIGHT_PREFS)
+    for arg in LIGHTWEIGHT_ARGS:
+        options.add_argument(arg)
     # Mobile emulation keeps layout consistent with the provided screenshot
     mobile_emulation = {"deviceName": "Nexus 5"}
     options.add_experimental_option("mobileEmulation", mobile_emulation)
@@ -33,8 +236,25 @@ def _chrome_driver(headless: bool = True):
         "user-agent=Mozilla/5.0 (Linux; Android 10; SM-G973F) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36"
     )
 
-    service = Service(ChromeDriverManager().install())
-    return webdriver.Chrome(service=service, options=options)
+    service = Service(_driver_binary())
+    driver = webdriver.Chrome(service=service, options=options)
+    try:
+        # Registered once per browser; applies to every document it loads afterwards
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": NEW_DOCUMENT_JS})
+    except Exception:
+        pass
+    _block_heavy_requests(driver)
+    return driver
+
+
+def _wait_gone(driver, element, timeout: float = 3):
+    """Wait until a clicked consent button is detached, instead of a fixed pause."""
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    try:
+        WebDriverWait(driver, timeout).until(EC.staleness_of(element))
+    except Exception:
+        pass
 
 
 def _accept_consent(driver):
@@ -46,7 +266,7 @@ def _accept_consent(driver):
         # Common button id
         btn = WebDriverWait(driver, 3).until(EC.element_to_be_clickable((By.ID, "L2AGLb")))
         btn.click()
-        time.sleep(0.3)
+        _wait_gone(driver, btn)
         return
     except Exception:
         pass
@@ -55,11 +275,81 @@ def _accept_consent(driver):
         candidates = driver.find_elements(By.XPATH, "//button//*[text()='Accept all']/..|//button//*[text()='I agree']/..")
         if candidates:
             candidates[0].click()
-            time.sleep(0.3)
+            _wait_gone(driver, candidates[0])
     except Exception:
         pass
 
 
+# Set NOWCAST_DEBUG_HTML=1 to keep the page source of cities where no data was found
+SAVE_DEBUG_HTML = os.getenv("NOWCAST_DEBUG_HTML") == "1"
+
+# Persistent Chrome profiles, one sub-directory per worker slot
+PROFILE_ROOT = Path.home() / ".cache" / "nowcast_profile"
+
+# One browser per worker thread, reused across the cities that thread handles
+_driver_local = threading.local()
+_driver_registry = []
+_driver_registry_lock = threading.Lock()
+
+
+def _pooled_driver(headless: bool = True):
+    """Return this thread's browser, creating it (and passing consent) on first use."""
+    driver = getattr(_driver_local, "driver", None)
+    if driver is None:
+        # Profile per worker slot (thread names are <prefix>_0.._N-1), so Chrome's
+        # profile lock never collides and consent/cache stay warm between runs
+        profile_dir = PROFILE_ROOT / threading.current_thread().name
+        driver = _chrome_driver(headless=headless, profile_dir=profile_dir)
+        try:
+            driver.get("https://www.google.com/ncr?hl=en&gl=us")
+            _accept_consent(driver)
+        except Exception:
+            # Not pooled yet: quit it here, or it keeps the profile locked for this slot
+            driver.quit()
+            raise
+        _driver_local.driver = driver
+        with _driver_registry_lock:
+            _driver_registry.append(driver)
+    return driver
+
+
+def _discard_pooled_driver():
+    """Quit and forget this thread's browser so the next city starts a fresh one."""
+    driver = getattr(_driver_local, "driver", None)
+    if driver is None:
+        return
+    _driver_local.driver = None
+    with _driver_registry_lock:
+        if driver in _driver_registry:
+            _driver_registry.remove(driver)
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+def _driver_alive(driver) -> bool:
+    try:
+        driver.current_url
+        return True
+    except Exception:
+        return False
+
+
+def _quit_pooled_drivers():
+    with _driver_registry_lock:
+        drivers = list(_driver_registry)
+        _driver_registry.clear()
+    for driver in drivers:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+
+atexit.register(_quit_pooled_drivers)
+
+
 def scrape_nowcast_svg(
     city: str = "Fairfax, California, United States",
     city_id: str = "",
@@ -67,10 +357,13 @@ def scrape_nowcast_svg(
     save_json: bool = True,
     output_dir: str | Path | None = None,
     first_scrape_date: str | None = None,
+    driver=None,
 ):
     """Scrape rect heights from the SVG whose viewBox includes 1440 and 48.
 
     Returns a dict with fields: city, city_id, scrape_time, viewBox, points (list of {time,height,fill,x,y,width}).
+    If driver is given it is reused (consent already handled) and left open;
+    otherwise a fresh browser is started and quit afterwards.
     """
     try:
         from selenium.webdriver.common.by import By
@@ -82,172 +375,84 @@ def scrape_nowcast_svg(
 
     base_dir = Path(output_dir) if output_dir else Path(__file__).parent
 
+    # One clock read per scrape: scrape_time, output folder and file names all derive from it
+    scrape_now = datetime.now(timezone.utc)
+    folder_date = first_scrape_date if first_scrape_date else scrape_now.strftime("%Y%m%d%H")
+
     out = {
         "city": city,
         "city_id": city_id,
-        "scrape_time": datetime.now(timezone.utc).isoformat(),
+        "scrape_time": scrape_now.isoformat(),
         "type": None,
         "viewBox": None,
         "points": []
     }
 
-    driver = _chrome_driver(headless=headless)
+    own_driver = driver is None
+    if own_driver:
+        driver = _chrome_driver(headless=headless)
     try:
         # Open Google with US locale, then search
-        driver.get("https://www.google.com/ncr?hl=en&gl=us")
-        _accept_consent(driver)
+        if own_driver:
+            driver.get("https://www.google.com/ncr?hl=en&gl=us")
+            _accept_consent(driver)
 
         # Direct search URL keeps things simple
-        from urllib.parse import quote_plus
-        q = quote_plus(f"weather {city}")
-        driver.get(f"https://www.google.com/search?q={q}&hl=en&gl=us")
+        driver.get(_search_url(city))
 
-        # Give time to render
-        time.sleep(3)
+        # Continue as soon as any target container (or the robot check page) renders
+        try:
+            WebDriverWait(driver, 5).until(lambda d: d.execute_script(PAGE_READY_JS))
+        except Exception:
+            pass  # Timed out: fall through and let the extraction report what is missing
         
-        # Check for reCAPTCHA robot verification
-        check_robot_js = """
-        const pageText = document.body.innerText;
-        const hasRobotCheck = pageText.includes("I'm not a robot") || pageText.includes("unusual traffic");
-        return hasRobotCheck;
-        """
-        is_robot_check = driver.execute_script(check_robot_js)
-        if is_robot_check:
+        # One round-trip: robot check, target SVG, fallback div and hourly probe
+        result = driver.execute_script(EXTRACT_JS) or {"kind": "none", "reason": "unknown"}
+        kind = result.get("kind")
+        if kind == "robot":
             print("⚠ reCAPTCHA verification detected: 'I'm not a robot'")
             out["type"] = "robot"
             if save_json:
-                folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
-                file_timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-                outdir = base_dir / "Crawled" / folder_date
-                outdir.mkdir(parents=True, exist_ok=True)
-                fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
-                fname.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
-                print("Saved:", fname)
+                _save_output(out, base_dir, city_id, folder_date, scrape_now.strftime("%Y%m%d_%H%M%S"))
             return out
 
-        # Run JS to find the target SVG and collect rect heights
-        js = """
-        const all = document.querySelectorAll('svg');
-        const withRects = [];
-        for (const svg of all) {
-            const rects = svg.querySelectorAll('rect');
-            if (rects.length) {
-                withRects.push({svg, viewBox: svg.getAttribute('viewBox'), rectCount: rects.length});
-            }
-        }
-        let target = null;
-        for (const info of withRects) {
-            const vb = (info.viewBox || "");
-            if (vb.includes('1440') && vb.includes('48')) { target = info; break; }
-        }
-        if (!target) {
-            return {found:false, sample: withRects.slice(0, 10)};
-        }
-        const rects = target.svg.querySelectorAll('rect');
-        const rows = [];
-        for (let i=0;i<rects.length;i++){
-            const r = rects[i];
-            rows.push({
-                idx:i,
-                height: r.getAttribute('height')||'',
-                fill: r.getAttribute('fill')||'',
-                x: r.getAttribute('x')||'',
-                y: r.getAttribute('y')||'',
-                width: r.getAttribute('width')||''
-            });
-        }
-        return {found:true, viewBox: target.viewBox, rects: rows};
-        """
-
-        result = driver.execute_script(js)
-        if not result or not result.get("found"):
-            # Fallback: try div[jsname="Kt2ahd"][class="XhUg9e"]
+        if kind != "nowcast":
             print("No target SVG found. Trying fallback div...")
-            fallback_js = """
-            const div = document.querySelector('div[jsname="Kt2ahd"].XhUg9e');
-            if (!div) return {found: false, reason: 'no_kt2ahd_div'};
-            
-            // Find the two target divs
-            const div1 = div.querySelector('.SnOHQb.tNxQIb');
-            const div2 = div.querySelector('.jz8NAf.ApHyTb');
-            
-            if (!div1 && !div2) return {found: false, reason: 'no_target_divs'};
-            
-            const data = {
-                div1_text: div1 ? div1.textContent.trim() : null,
-                div2_text: div2 ? div2.textContent.trim() : null
-            };
-            
-            return {found: true, source: 'fallback_div', data: data};
-            """
-            
-            fallback_result = driver.execute_script(fallback_js)
-            if fallback_result and fallback_result.get("found"):
-                print(f"Fallback OK: found divs with classes SnOHQb/jz8NAf")
-                print(f"  div1: {fallback_result.get('data', {}).get('div1_text', 'N/A')[:50]}")
-                print(f"  div2: {fallback_result.get('data', {}).get('div2_text', 'N/A')[:50]}")
-                # Store fallback data in output
-                out["fallback_data"] = fallback_result.get("data")
-                out["source"] = "fallback_div"
-                out["type"] = "nowcast"
+        if kind == "fallback":
+            print(f"Fallback OK: found divs with classes SnOHQb/jz8NAf")
+            print(f"  div1: {result.get('data', {}).get('div1_text', 'N/A')[:50]}")
+            print(f"  div2: {result.get('data', {}).get('div2_text', 'N/A')[:50]}")
+            # Store fallback data in output
+            out["fallback_data"] = result.get("data")
+            out["source"] = "fallback_div"
+            out["type"] = "nowcast"
+            # Ensure downstream logic has a result object
+            result = {"viewBox": None, "rects": []}
+        elif kind != "nowcast":
+            print("Fallback div not found. Trying hourly forecast (aria-label)...")
+            if kind == "hourly":
+                print(f"Hourly forecast OK: found {result.get('count', 0)} items")
+                print(f"  Sample: {result.get('labels', [])[:3]}")
+                # Store hourly data in output
+                out["hourly_data"] = result.get("labels", [])
+                out["source"] = "hourly_aria_label"
+                out["type"] = "hourly"
                 # Ensure downstream logic has a result object
                 result = {"viewBox": None, "rects": []}
             else:
-                # Third fallback: try hourly forecast data (aria-label)
-                print("Fallback div not found. Trying hourly forecast (aria-label)...")
-                hourly_js = """
-                const container = document.querySelector('[jsname="s2gQvd"].EDblX.HG5ZQb');
-                if (!container) return { found: false, reason: 'no_hourly_container' };
-
-                const items = container.querySelectorAll('[role="listitem"][aria-label]');
-                if (!items || items.length === 0) {
-                    return { found: false, reason: 'no_hourly_items' };
-                }
-
-                const labels = [];
-                for (let i = 0; i < Math.min(6, items.length); i++) {
-                    const ariaLabel = items[i].getAttribute('aria-label');
-                    if (ariaLabel) labels.push(ariaLabel);
-                }
-                return { found: labels.length > 0, count: labels.length, labels: labels };
-                """
-                
-                hourly_result = driver.execute_script(hourly_js)
-                if hourly_result and hourly_result.get("found"):
-                    print(f"Hourly forecast OK: found {hourly_result.get('count', 0)} items")
-                    print(f"  Sample: {hourly_result.get('labels', [])[:3]}")
-                    # Store hourly data in output
-                    out["hourly_data"] = hourly_result.get("labels", [])
-                    out["source"] = "hourly_aria_label"
-                    out["type"] = "hourly"
-                    # Ensure downstream logic has a result object
-                    result = {"viewBox": None, "rects": []}
-                else:
-                    # All methods failed - save HTML for inspection
-                    html = driver.page_source
-                    dbg = base_dir / "debug_nowcast_fairfax.html"
-                    dbg.write_text(html, encoding="utf-8")
-                    reason = hourly_result.get('reason') if hourly_result else 'unknown'
-                    print(f"No data found (reason: {reason}). Wrote {dbg.name}")
-                    # Delete debug file after saving
-                    try:
-                        import time as time_module
-                        time_module.sleep(0.5)  # Brief delay to ensure file is written
-                        dbg.unlink()  # Delete the file
-                        print(f"Debug file deleted: {dbg.name}")
-                    except Exception as del_err:
-                        print(f"Could not delete debug file: {del_err}")
-                    # Persist a minimal JSON to indicate no data
-                    out["message"] = "no nowcast data now."
-                    if save_json:
-                        folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
-                        file_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        outdir = base_dir / "Crawled" / folder_date
-                        outdir.mkdir(parents=True, exist_ok=True)
-                        fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
-                        fname.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
-                        print("Saved:", fname)
-                    return out
+                # All methods failed
+                reason = result.get('reason', 'unknown')
+                print(f"No data found (reason: {reason}).")
+                if SAVE_DEBUG_HTML:
+                    # Opt-in: keep the page source for inspection (page_source is a large transfer)
+                    dbg = base_dir / f"debug_nowcast_{city_id}.html"
+                    dbg.write_text(driver.page_source, encoding="utf-8")
+                    print(f"Wrote {dbg.name}")
+                # Persist a minimal JSON to indicate no data
+                out["message"] = "no nowcast data now."
+                if save_json:
+                    _save_output(out, base_dir, city_id, folder_date, scrape_now.astimezone().strftime("%Y%m%d_%H%M%S"))
+                return out
 
         out["viewBox"] = result.get("viewBox")
         if result.get("source"):
@@ -255,46 +460,17 @@ def scrape_nowcast_svg(
         if not out["type"]:  # Only set if not already set (e.g., by hourly fallback)
             out["type"] = "nowcast"
         rows = result.get("rects") or []
-        start = datetime.fromisoformat(out["scrape_time"])  # base time
+        start = scrape_now  # base time
         # If minute is odd, subtract 1 minute to make it even
         if start.minute % 2 == 1:
             start = start - timedelta(minutes=1)
-        for row in rows:
-            t = start + timedelta(minutes=int(row.get("idx", 0)) * 2)
-            out["points"].append({
-                "minute_index": int(row.get("idx", 0)),
-                "time": t.strftime("%Y-%m-%d %H:%M"),
-                "height": row.get("height"),
-                "fill": row.get("fill"),
-                "x": row.get("x"),
-                "y": row.get("y"),
-                "width": row.get("width")
-            })
+        out["points"] = _rects_to_points(rows, start)
 
         if save_json and out["points"]:
-            folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
-            file_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            outdir = base_dir / "Crawled" / folder_date
-            outdir.mkdir(parents=True, exist_ok=True)
-            fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
-            fname.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
-            print("Saved:", fname)
-        elif save_json and out.get("fallback_data"):
-            folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
-            file_timestamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
-            outdir = base_dir / "Crawled" / folder_date
-            outdir.mkdir(parents=True, exist_ok=True)
-            fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
-            fname.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
-            print("Saved:", fname)
-        elif save_json and out.get("hourly_data"):
-            folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
-            file_timestamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
-            outdir = base_dir / folder_date
-            outdir.mkdir(parents=True, exist_ok=True)
-            fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
-            fname.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
-            print("Saved:", fname)
+            # Points files keep the local-time YYYYMMDD_HHMMSS name the downstream scripts expect
+            _save_output(out, base_dir, city_id, folder_date, scrape_now.astimezone().strftime("%Y%m%d_%H%M%S"))
+        elif save_json and (out.get("fallback_data") or out.get("hourly_data")):
+            _save_output(out, base_dir, city_id, folder_date, scrape_now.strftime("%Y%m%d%H%M%S"))
 
         return out
 
@@ -302,39 +478,89 @@ def scrape_nowcast_svg(
         print("ERR:", e)
         return None
     finally:
-        try:
-            driver.quit()
-        except Exception:
-            pass
+        if own_driver:
+            try:
+                driver.quit()
+            except Exception:
+                pass
 
 
-def scrape_all_cities():
-    """爬取所有城市的气象数据"""
-    df = pd.read_csv('nowcast_crawl_list_v2.csv')
-    name_list = df['name'].tolist()
-    id_list = df['id'].tolist()
+class ProgressTracker:
+    def __init__(self, total):
+        self.total = total
+        self.completed = 0
+        self.lock = threading.Lock()
+    
+    def increment(self):
+        with self.lock:
+            self.completed += 1
+            return self.completed
+
+
+def _scrape_one(city, city_id, first_scrape_date, output_root, headless, tracker):
+    """在当前线程的浏览器中爬取单个城市"""
+    # 随机错开各线程的请求，避免同时发起导致触发限流
+    time.sleep(random.uniform(0.5, 1.5))
+    driver = _pooled_driver(headless=headless)
+    data = scrape_nowcast_svg(city, city_id=city_id, headless=headless, save_json=True, output_dir=output_root, first_scrape_date=first_scrape_date, driver=driver)
+    if data is None and not _driver_alive(driver):
+        # 浏览器崩溃或会话失效时丢弃，下一个城市重新创建
+        _discard_pooled_driver()
+    completed = tracker.increment()
+    if data and data.get("points"):
+        print(f"[{completed}/{tracker.total}] ✓ {city} (ID: {city_id}) OK points: {len(data['points'])}, viewBox: {data.get('viewBox')}")
+    else:
+        print(f"[{completed}/{tracker.total}] ✗ {city} (ID: {city_id}) No data scraped.")
+    return data
+
+
+def scrape_all_cities(max_workers: int = 4):
+    """爬取所有城市的气象数据（多线程，每个线程复用一个浏览器）"""
+    with open('nowcast_crawl_list_v2.csv', newline='', encoding='utf-8-sig') as f:
+        rows = list(csv.DictReader(f))
+    name_list = [row['name'] for row in rows]
+    id_list = [row['id'] for row in rows]
     output_root = Path(__file__).parent
     first_scrape_date = datetime.now(timezone.utc).strftime("%Y%m%d%H")
     
     print(f"\n{'='*60}")
     print(f"开始爬取任务 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"输出文件夹: {first_scrape_date}")
+    print(f"总城市数: {len(name_list)}, 并发线程数: {max_workers}")
     print(f"{'='*60}")
     
-    for idx, (city, city_id) in enumerate(zip(name_list, id_list), 1):
-        print(f"\n[{idx}/{len(name_list)}] Running nowcast SVG scraper for: {city} (ID: {city_id})")
-        data = scrape_nowcast_svg(city, city_id=city_id, headless=False, save_json=True, output_dir=output_root, first_scrape_date=first_scrape_date)
-        if data and data.get("points"):
-            print(f"  ✓ OK points: {len(data['points'])}, viewBox: {data.get('viewBox')}")
-        else:
-            print(f"  ✗ No data scraped.")
-        time.sleep(2)  # 爬取间隔，避免请求过快
+    tracker = ProgressTracker(len(name_list))
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="nowcast") as executor:
+            futures = {
+                executor.submit(_scrape_one, city, city_id, first_scrape_date, output_root, False, tracker): city_id
+                for city, city_id in zip(name_list, id_list)
+            }
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"✗ Exception for {futures[future]}: {e}")
+    finally:
+        # 工作线程随线程池结束，本轮创建的浏览器一并关闭
+        _quit_pooled_drivers()
     
     print(f"\n{'='*60}")
     print(f"爬取任务完成 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"{'='*60}\n")
 
 
+def _next_run_time(now, run_times):
+    """返回 now 之后最近的一个 (小时, 分钟) 执行时间点"""
+    candidates = []
+    for hour, minute in run_times:
+        run_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if run_at <= now:
+            run_at += timedelta(days=1)
+        candidates.append(run_at)
+    return min(candidates)
+
+
 if __name__ == "__main__":
     # Keep output ASCII-only to avoid Windows codepage issues
     import pytz
@@ -343,10 +569,7 @@ if __name__ == "__main__":
     beijing_tz = pytz.timezone('Asia/Shanghai')
     
     # 每天北京时间 0点、6点、12点、18点各执行一次
-    schedule.every().day.at("00:00").do(scrape_all_cities)
-    schedule.every().day.at("06:00").do(scrape_all_cities)
-    schedule.every().day.at("12:00").do(scrape_all_cities)
-    schedule.every().day.at("18:00").do(scrape_all_cities)
+    run_times = [(0, 0), (6, 0), (12, 0), (18, 0)]
     
     print("✓ 定时爬虫已启动")
     print(f"✓ 将在每天北京时间 00:00, 06:00, 12:00, 18:00 执行爬取任务")
@@ -356,10 +579,13 @@ if __name__ == "__main__":
     # 立即执行一次（可选，注释掉则只在指定时间执行）
     scrape_all_cities()
     
-    # 持续运行调度器
+    # 直接睡眠到下一个执行时间点，而不是每分钟轮询一次
     try:
         while True:
-            schedule.run_pending()
-            time.sleep(60)  # 每分钟检查一次是否需要执行
+            now = datetime.now(beijing_tz)
+            next_run = _next_run_time(now, run_times)
+            print(f"✓ 下次执行时间(北京时间): {next_run.strftime('%Y-%m-%d %H:%M:%S')}")
+            time.sleep((next_run - now).total_seconds())
+            scrape_all_cities()
     except KeyboardInterrupt:
         print("\n\n程序已停止")
@@ -8,11 +8,205 @@ import sys
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 import json
+import gzip
 import time
+import queue
+from collections import deque
+from contextlib import contextmanager
 from apscheduler.schedulers.background import BackgroundScheduler
 import pandas as pd
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
+import itertools
+from functools import lru_cache
+from urllib.parse import quote_plus
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+# Content settings that cut page-load bytes without touching the DOM the
+# scraper reads (stylesheets stay on: innerText and the widget layout depend on them)
+LIGHTWEIGHT_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.default_content_setting_values.notifications": 2,
+}
+
+# Requests the scraper never needs. Only URLs are matched, so the inline nowcast SVG is unaffected
+BLOCKED_URL_PATTERNS = (
+    "*.png",
+    "*.jpg",
+    "*.jpeg",
+    "*.gif",
+    "*.webp",
+    "*.svg?*",
+    "*.woff",
+    "*.woff2",
+)
+
+# Set NOWCAST_DEBUG_DIR to keep the page source of cities where no data was found
+DEBUG_DIR = os.environ.get("NOWCAST_DEBUG_DIR")
+
+# True once the SVG, fallback div, hourly list or a robot check page is present
+PAGE_READY_JS = """
+if (document.querySelector('svg[viewBox*="1440"] rect, div[jsname="Kt2ahd"], [jsname="s2gQvd"] [role="listitem"]')) return true;
+const pageText = document.body ? document.body.innerText : '';
+return pageText.includes("I'm not a robot") || pageText.includes("unusual traffic");
+"""
+
+# Best-effort acceptance of Google consent dialogs: the common button id, then
+# an "Accept all" / "I agree" button. The next driver.get waits for any redirect
+CONSENT_JS = """
+const btn = document.getElementById('L2AGLb');
+if (btn) { btn.click(); return 'id'; }
+const alt = document.evaluate(
+    "//button[.//*[text()='Accept all' or text()='I agree']]",
+    document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+).singleNodeValue;
+if (alt) { alt.click(); return 'xpath'; }
+return null;
+"""
+
+# Fused extraction script, evaluated once per city. Checks in priority order and
+# returns {kind: 'robot' | 'nowcast' | 'fallback' | 'hourly' | 'none', ...}.
+EXTRACT_JS = """
+const pageText = document.body.innerText;
+if (pageText.includes("I'm not a robot") || pageText.includes("unusual traffic")) {
+    return {kind: 'robot'};
+}
+
+// Target SVG: the first one with rects whose viewBox includes 1440 and 48
+for (const svg of document.querySelectorAll('svg')) {
+    const vb = svg.getAttribute('viewBox') || "";
+    if (!(vb.includes('1440') && vb.includes('48'))) continue;
+    const rects = svg.querySelectorAll('rect');
+    if (!rects.length) continue;
+    const rows = [];
+    for (let i = 0; i < rects.length; i++) {
+        const r = rects[i];
+        rows.push({
+            idx: i,
+            height: r.getAttribute('height') || '',
+            fill: r.getAttribute('fill') || '',
+            x: r.getAttribute('x') || '',
+            y: r.getAttribute('y') || '',
+            width: r.getAttribute('width') || ''
+        });
+    }
+    return {kind: 'nowcast', viewBox: vb, rects: rows};
+}
+
+// Fallback: div[jsname="Kt2ahd"].XhUg9e with the two summary divs
+const div = document.querySelector('div[jsname="Kt2ahd"].XhUg9e');
+if (div) {
+    const div1 = div.querySelector('.SnOHQb.tNxQIb');
+    const div2 = div.querySelector('.jz8NAf.ApHyTb');
+    if (div1 || div2) {
+        return {kind: 'fallback', data: {
+            div1_text: div1 ? div1.textContent.trim() : null,
+            div2_text: div2 ? div2.textContent.trim() : null
+        }};
+    }
+}
+
+// Third fallback: first six hourly forecast aria-labels
+const container = document.querySelector('[jsname="s2gQvd"].EDblX.HG5ZQb');
+if (!container) return {kind: 'none', reason: 'no_hourly_container'};
+const items = container.querySelectorAll('[role="listitem"][aria-label]');
+if (!items.length) return {kind: 'none', reason: 'no_hourly_items'};
+const labels = [];
+for (let i = 0; i < Math.min(6, items.length); i++) {
+    const ariaLabel = items[i].getAttribute('aria-label');
+    if (ariaLabel) labels.push(ariaLabel);
+}
+if (!labels.length) return {kind: 'none', reason: 'no_hourly_items'};
+return {kind: 'hourly', count: labels.length, labels: labels};
+"""
+
+
+def _dump_json(obj) -> bytes:
+    """Serialize to indented UTF-8 JSON; orjson when available, else the stdlib."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _dump_json_line(obj) -> str:
+    """One compact NDJSON line (trailing newline included)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+# Output directories already created by this process (all cities of a run share one)
+_MKDIR_CACHE = set()
+
+
+def _ensure_dir(path: Path):
+    key = str(path)
+    if key not in _MKDIR_CACHE:
+        path.mkdir(parents=True, exist_ok=True)
+        _MKDIR_CACHE.add(key)
+
+
+def _utc_stamp(dt) -> str:
+    """YYYYMMDDHHMMSS for dt, built from its fields instead of strftime."""
+    return f"{dt.year:04d}{dt.month:02d}{dt.day:02d}{dt.hour:02d}{dt.minute:02d}{dt.second:02d}"
+
+
+def _save_out_json(out, base_dir, city_id, folder_date, file_timestamp):
+    """Write one scrape result to Crawled/<folder_date>/nowcast_<city_id>_<file_timestamp>.json.
+
+    The payload goes to a .json.tmp sibling first and is renamed into place, so
+    readers scanning *.json never see a partially written file.
+    """
+    outdir = base_dir / "Crawled" / folder_date
+    _ensure_dir(outdir)
+    fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
+    tmp = fname.with_suffix(".json.tmp")
+    tmp.write_bytes(_dump_json(out))
+    os.replace(tmp, fname)
+    return fname
+
+
+@lru_cache(maxsize=4096)
+def _search_url(city: str) -> str:
+    """Google weather search URL for a city (cached: the city list repeats every batch and run)."""
+    return f"https://www.google.com/search?q={quote_plus(f'weather {city}')}&hl=en&gl=us"
+
+
+def _rects_to_points(rows, start):
+    """Turn the JS rect rows into output points, one per 2-minute step from start."""
+    step = timedelta(minutes=2)
+    points = []
+    for row in rows:
+        idx = int(row.get("idx", 0))
+        points.append({
+            "minute_index": idx,
+            "time": (start + step * idx).strftime("%Y-%m-%d %H:%M"),
+            "height": row.get("height"),
+            "fill": row.get("fill"),
+            "x": row.get("x"),
+            "y": row.get("y"),
+            "width": row.get("width")
+        })
+    return points
+
+
+def _block_heavy_requests(driver):
+    """Block image and font URLs at the network layer via CDP (best effort)."""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(BLOCKED_URL_PATTERNS)})
+    except Exception:
+        pass  # CDP surface differs between Chrome versions
 
 
 def _chrome_driver(headless: bool = True):
@@ -27,35 +221,161 @@ def _chrome_driver(headless: bool = True):
     options.add_argument("--disable-blink-features=AutomationControlled")
     options.add_experimental_option("excludeSwitches", ["enable-automation"]) 
     options.add_experimental_option("useAutomationExtension", False)
+    options.add_experimental_option("prefs", LIGHTWEIGHT_PREFS)
     mobile_emulation = {"deviceName": "Nexus 5"}
     options.add_experimental_option("mobileEmulation", mobile_emulation)
     options.add_argument(
         "user-agent=Mozilla/5.0 (Linux; Android 10; SM-G973F) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36"
     )
 
-    # Selenium 4.6+ automatically manages ChromeDriver - no webdriver-manager needed
-    return webdriver.Chrome(options=options)
+    # Selenium 4.6+ automatically manages ChromeDriver - no webdriver-manager needed.
+    service = Service()
+    driver = webdriver.Chrome(service=service, options=options)
+    _block_heavy_requests(driver)
+    return driver
 
 
 def _accept_consent(driver):
+    """Click Google's consent button in one script call; returns how it was found (or None)."""
     try:
-        from selenium.webdriver.common.by import By
-        from selenium.webdriver.support.ui import WebDriverWait
-        from selenium.webdriver.support import expected_conditions as EC
-        btn = WebDriverWait(driver, 3).until(EC.element_to_be_clickable((By.ID, "L2AGLb")))
-        btn.click()
-        time.sleep(0.3)
-        return
+        return driver.execute_script(CONSENT_JS)
     except Exception:
-        pass
+        return None
+
+
+def _core_groups(size):
+    """Split the usable cores into size contiguous groups, or [] when pinning should be skipped."""
+    if psutil is None or size <= 0:
+        return []
     try:
-        from selenium.webdriver.common.by import By
-        candidates = driver.find_elements(By.XPATH, "//button//*[text()='Accept all']/..|//button//*[text()='I agree']/..")
-        if candidates:
-            candidates[0].click()
-            time.sleep(0.3)
+        cores = sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = list(range(os.cpu_count() or 1))
+    # A single core per browser would serialize Chrome's browser/renderer/GPU processes
+    if len(cores) < 2 * size:
+        return []
+    per = len(cores) // size
+    return [cores[i * per:(i + 1) * per] for i in range(size)]
+
+
+def _driver_alive(driver) -> bool:
+    try:
+        driver.current_url
+        return True
     except Exception:
-        pass
+        return False
+
+
+class ChromeDriverPool:
+    """Bounded pool of Chrome drivers shared by the worker threads of a run.
+
+    Drivers are started lazily (at most size of them), pass the consent page
+    once, and are handed back after every city instead of being quit.
+    With psutil and at least two cores per driver, each browser's process
+    tree is pinned to its own contiguous block of cores.
+    """
+
+    def __init__(self, size, headless=True):
+        self.size = size
+        self.headless = headless
+        self._q = queue.Queue()
+        self._drivers = []
+        self._slots = 0  # drivers started or starting
+        self._lock = threading.Lock()
+        self._free_cores = deque(_core_groups(size))
+        self._cores = {}  # driver -> core group it is pinned to
+
+    def _new_driver(self):
+        driver = _chrome_driver(headless=self.headless)
+        try:
+            driver.get("https://www.google.com/ncr?hl=en&gl=us")
+            _accept_consent(driver)
+        except Exception:
+            driver.quit()
+            raise
+        self._pin(driver)
+        return driver
+
+    def _pin(self, driver):
+        """Pin chromedriver, Chrome and its helpers (zygote included, so later renderers inherit it)."""
+        with self._lock:
+            if not self._free_cores:
+                return
+            cores = self._free_cores.popleft()
+            self._cores[driver] = cores
+        try:
+            root = psutil.Process(driver.service.process.pid)
+            for proc in [root] + root.children(recursive=True):
+                try:
+                    proc.cpu_affinity(cores)
+                except psutil.Error:
+                    pass  # helper exited in the meantime
+        except Exception:
+            pass
+
+    def _release_cores(self, driver):
+        # Called with self._lock held
+        cores = self._cores.pop(driver, None)
+        if cores is not None:
+            self._free_cores.append(cores)
+
+    @contextmanager
+    def checkout(self):
+        try:
+            driver = self._q.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._slots < self.size
+                if create:
+                    self._slots += 1  # reserve the slot before the slow start
+            if create:
+                try:
+                    driver = self._new_driver()
+                except Exception:
+                    with self._lock:
+                        self._slots -= 1
+                    raise
+                with self._lock:
+                    self._drivers.append(driver)
+            else:
+                driver = self._q.get()
+        try:
+            yield driver
+        finally:
+            with self._lock:
+                keep = driver in self._drivers
+            if keep:
+                self._q.put(driver)
+
+    def discard(self, driver):
+        """Quit a broken driver; its slot is refilled by the next checkout."""
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+                self._slots -= 1
+            self._release_cores(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def shutdown(self):
+        with self._lock:
+            drivers = list(self._drivers)
+            self._drivers.clear()
+            self._slots = 0
+            for driver in drivers:
+                self._release_cores(driver)
+        while True:
+            try:
+                self._q.get_nowait()
+            except queue.Empty:
+                break
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
 
 
 def scrape_nowcast_svg(
@@ -65,174 +385,111 @@ def scrape_nowcast_svg(
     save_json: bool = True,
     output_dir: str | Path | None = None,
     first_scrape_date: str | None = None,
+    driver=None,
+    save_html: bool = False,
 ):
-    """Scrape rect heights from the SVG whose viewBox includes 1440 and 48."""
+    """Scrape rect heights from the SVG whose viewBox includes 1440 and 48.
+
+    If driver is given (e.g. from ChromeDriverPool) it is reused with consent
+    already handled and left open; otherwise a fresh browser is started.
+    With save_html the page source is kept as GoogleNowcastHTML/<date>/<id>_<date>.html.gz.
+    """
     try:
-        from selenium.webdriver.common.by import By
         from selenium.webdriver.support.ui import WebDriverWait
-        from selenium.webdriver.support import expected_conditions as EC
     except Exception as e:
         print(f"ERR [{city}]: selenium not available:", e)
         return None
 
     base_dir = Path(output_dir) if output_dir else Path(__file__).parent
+    # One clock read per scrape: scrape_time, output folder and file names all derive from it
+    scrape_now = datetime.now(timezone.utc)
+    stamp = _utc_stamp(scrape_now)
+    folder_date = first_scrape_date if first_scrape_date else stamp[:10]
 
     out = {
         "city": city,
         "city_id": city_id,
-        "scrape_time": datetime.now(timezone.utc).isoformat(),
+        "scrape_time": scrape_now.isoformat(),
         "type": None,
         "viewBox": None,
         "points": []
     }
 
-    driver = _chrome_driver(headless=headless)
+    own_driver = driver is None
+    if own_driver:
+        driver = _chrome_driver(headless=headless)
     try:
-        driver.get("https://www.google.com/ncr?hl=en&gl=us")
-        _accept_consent(driver)
+        if own_driver:
+            driver.get("https://www.google.com/ncr?hl=en&gl=us")
+            _accept_consent(driver)
 
-        from urllib.parse import quote_plus
-        q = quote_plus(f"weather {city}")
-        driver.get(f"https://www.google.com/search?q={q}&hl=en&gl=us")
+        driver.get(_search_url(city))
 
-        time.sleep(3)
-        
-        # Save HTML page
+        # Continue as soon as any target container (or the robot check page) renders
         try:
-            html_content = driver.page_source
-            folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
-            html_dir = base_dir / "GoogleNowcastHTML" / folder_date
-            html_dir.mkdir(parents=True, exist_ok=True)
-            html_filename = f"{city_id}_{folder_date}.html"
-            html_path = html_dir / html_filename
-            html_path.write_text(html_content, encoding="utf-8")
-            print(f"[{city}] Saved HTML: {html_filename}")
-        except Exception as e:
-            print(f"[{city}] Warning: Could not save HTML: {e}")
+            WebDriverWait(driver, 5, poll_frequency=0.1).until(lambda d: d.execute_script(PAGE_READY_JS))
+        except Exception:
+            pass  # Timed out: fall through and let the extraction report what is missing
         
-        # Check for reCAPTCHA robot verification
-        check_robot_js = """
-        const pageText = document.body.innerText;
-        const hasRobotCheck = pageText.includes("I'm not a robot") || pageText.includes("unusual traffic");
-        return hasRobotCheck;
-        """
-        is_robot_check = driver.execute_script(check_robot_js)
-        if is_robot_check:
+        # Save HTML page (opt-in: page_source is a large transfer and 0.5-2 MB per city)
+        if save_html:
+            try:
+                html_content = driver.page_source
+                html_dir = base_dir / "GoogleNowcastHTML" / folder_date
+                html_dir.mkdir(parents=True, exist_ok=True)
+                html_filename = f"{city_id}_{folder_date}.html.gz"
+                html_path = html_dir / html_filename
+                # Level 1: several times faster than the default and still shrinks the HTML ~5x
+                with gzip.open(html_path, "wt", compresslevel=1, encoding="utf-8") as f:
+                    f.write(html_content)
+                print(f"[{city}] Saved HTML: {html_filename}")
+            except Exception as e:
+                print(f"[{city}] Warning: Could not save HTML: {e}")
+
+        # One round-trip: robot check, target SVG, fallback div and hourly probe
+        result = driver.execute_script(EXTRACT_JS) or {"kind": "none", "reason": "unknown"}
+        kind = result.get("kind")
+        if kind == "robot":
             print("⚠ reCAPTCHA verification detected: 'I'm not a robot'")
             out["type"] = "robot"
             if save_json:
-                folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
-                file_timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-                outdir = base_dir / "Crawled" / folder_date
-                outdir.mkdir(parents=True, exist_ok=True)
-                fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
-                fname.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
+                fname = _save_out_json(out, base_dir, city_id, folder_date, f"{stamp[:8]}_{stamp[8:]}")
                 print("Saved:", fname)
             return out
 
-        js = """
-        const all = document.querySelectorAll('svg');
-        const withRects = [];
-        for (const svg of all) {
-            const rects = svg.querySelectorAll('rect');
-            if (rects.length) {
-                withRects.push({svg, viewBox: svg.getAttribute('viewBox'), rectCount: rects.length});
-            }
-        }
-        let target = null;
-        for (const info of withRects) {
-            const vb = (info.viewBox || "");
-            if (vb.includes('1440') && vb.includes('48')) { target = info; break; }
-        }
-        if (!target) {
-            return {found:false, sample: withRects.slice(0, 10)};
-        }
-        const rects = target.svg.querySelectorAll('rect');
-        const rows = [];
-        for (let i=0;i<rects.length;i++){
-            const r = rects[i];
-            rows.push({
-                idx:i,
-                height: r.getAttribute('height')||'',
-                fill: r.getAttribute('fill')||'',
-                x: r.getAttribute('x')||'',
-                y: r.getAttribute('y')||'',
-                width: r.getAttribute('width')||''
-            });
-        }
-        return {found:true, viewBox: target.viewBox, rects: rows};
-        """
-
-        result = driver.execute_script(js)
-        if not result or not result.get("found"):
+        if kind != "nowcast":
             print(f"[{city}] No target SVG found. Trying fallback div...")
-            fallback_js = """
-            const div = document.querySelector('div[jsname="Kt2ahd"].XhUg9e');
-            if (!div) return {found: false, reason: 'no_kt2ahd_div'};
-            const div1 = div.querySelector('.SnOHQb.tNxQIb');
-            const div2 = div.querySelector('.jz8NAf.ApHyTb');
-            if (!div1 && !div2) return {found: false, reason: 'no_target_divs'};
-            const data = {
-                div1_text: div1 ? div1.textContent.trim() : null,
-                div2_text: div2 ? div2.textContent.trim() : null
-            };
-            return {found: true, source: 'fallback_div', data: data};
-            """
-            
-            fallback_result = driver.execute_script(fallback_js)
-            if fallback_result and fallback_result.get("found"):
-                print(f"[{city}] Fallback OK: found divs")
-                out["fallback_data"] = fallback_result.get("data")
-                out["source"] = "fallback_div"
-                out["type"] = "nowcast"
+        if kind == "fallback":
+            print(f"[{city}] Fallback OK: found divs")
+            out["fallback_data"] = result.get("data")
+            out["source"] = "fallback_div"
+            out["type"] = "nowcast"
+            result = {"viewBox": None, "rects": []}
+        elif kind != "nowcast":
+            print(f"[{city}] Fallback div not found. Trying hourly forecast...")
+            if kind == "hourly":
+                print(f"[{city}] Hourly forecast OK: {result.get('count', 0)} items")
+                out["hourly_data"] = result.get("labels", [])
+                out["source"] = "hourly_aria_label"
+                out["type"] = "hourly"
                 result = {"viewBox": None, "rects": []}
             else:
-                print(f"[{city}] Fallback div not found. Trying hourly forecast...")
-                hourly_js = """
-                const container = document.querySelector('[jsname="s2gQvd"].EDblX.HG5ZQb');
-                if (!container) return { found: false, reason: 'no_hourly_container' };
-                const items = container.querySelectorAll('[role="listitem"][aria-label]');
-                if (!items || items.length === 0) {
-                    return { found: false, reason: 'no_hourly_items' };
-                }
-                const labels = [];
-                for (let i = 0; i < Math.min(6, items.length); i++) {
-                    const ariaLabel = items[i].getAttribute('aria-label');
-                    if (ariaLabel) labels.push(ariaLabel);
-                }
-                return { found: labels.length > 0, count: labels.length, labels: labels };
-                """
-                
-                hourly_result = driver.execute_script(hourly_js)
-                if hourly_result and hourly_result.get("found"):
-                    print(f"[{city}] Hourly forecast OK: {hourly_result.get('count', 0)} items")
-                    out["hourly_data"] = hourly_result.get("labels", [])
-                    out["source"] = "hourly_aria_label"
-                    out["type"] = "hourly"
-                    result = {"viewBox": None, "rects": []}
-                else:
-                    html = driver.page_source
-                    dbg = base_dir / f"debug_nowcast_{city.split(',')[0].replace(' ', '_')}.html"
-                    dbg.write_text(html, encoding="utf-8")
-                    reason = hourly_result.get('reason') if hourly_result else 'unknown'
-                    print(f"[{city}] No data found (reason: {reason}). Wrote {dbg.name}")
-                    # Delete debug file after saving
+                reason = result.get('reason', 'unknown')
+                print(f"[{city}] No data found (reason: {reason}).")
+                if DEBUG_DIR:
+                    # Opt-in: keep the page source for inspection; rotation is left to the operator
                     try:
-                        import time as time_module
-                        time_module.sleep(0.5)  # Brief delay to ensure file is written
-                        dbg.unlink()  # Delete the file
-                        print(f"[{city}] Debug file deleted: {dbg.name}")
-                    except Exception as del_err:
-                        print(f"[{city}] Could not delete debug file: {del_err}")
-                    out["message"] = "no nowcast data now."
-                    if save_json:
-                        folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
-                        file_timestamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
-                        outdir = base_dir / "Crawled" / folder_date
-                        outdir.mkdir(parents=True, exist_ok=True)
-                        fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
-                        fname.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
-                    return out
+                        dbg_dir = Path(DEBUG_DIR)
+                        dbg_dir.mkdir(parents=True, exist_ok=True)
+                        dbg = dbg_dir / f"debug_nowcast_{city_id}_{stamp}.html"
+                        dbg.write_text(driver.page_source, encoding="utf-8")
+                        print(f"[{city}] Wrote {dbg.name}")
+                    except Exception as dbg_err:
+                        print(f"[{city}] Could not write debug file: {dbg_err}")
+                out["message"] = "no nowcast data now."
+                if save_json:
+                    _save_out_json(out, base_dir, city_id, folder_date, stamp)
+                return out
 
         out["viewBox"] = result.get("viewBox")
         if result.get("source"):
@@ -240,45 +497,14 @@ def scrape_nowcast_svg(
         if not out["type"]:
             out["type"] = "nowcast"
         rows = result.get("rects") or []
-        start = datetime.fromisoformat(out["scrape_time"])
+        start = scrape_now
         # If minute is odd, subtract 1 minute to make it even
         if start.minute % 2 == 1:
             start = start - timedelta(minutes=1)
-        for row in rows:
-            t = start + timedelta(minutes=int(row.get("idx", 0)) * 2)
-            out["points"].append({
-                "minute_index": int(row.get("idx", 0)),
-                "time": t.strftime("%Y-%m-%d %H:%M"),
-                "height": row.get("height"),
-                "fill": row.get("fill"),
-                "x": row.get("x"),
-                "y": row.get("y"),
-                "width": row.get("width")
-            })
-
-        if save_json and out["points"]:
-            folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
-            file_timestamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
-            outdir = base_dir / "Crawled" / folder_date
-            outdir.mkdir(parents=True, exist_ok=True)
-            fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
-            fname.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
-            print(f"[{city}] Saved: {fname.name}")
-        elif save_json and out.get("fallback_data"):
-            folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
-            file_timestamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
-            outdir = base_dir / "Crawled" / folder_date
-            outdir.mkdir(parents=True, exist_ok=True)
-            fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
-            fname.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
-            print(f"[{city}] Saved: {fname.name}")
-        elif save_json and out.get("hourly_data"):
-            folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
-            file_timestamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
-            outdir = base_dir / "Crawled" / folder_date
-            outdir.mkdir(parents=True, exist_ok=True)
-            fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
-            fname.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
+        out["points"] = _rects_to_points(rows, start)
+
+        if save_json and (out["points"] or out.get("fallback_data") or out.get("hourly_data")):
+            fname = _save_out_json(out, base_dir, city_id, folder_date, stamp)
             print(f"[{city}] Saved: {fname.name}")
 
         return out
@@ -287,28 +513,62 @@ def scrape_nowcast_svg(
         print(f"ERR [{city}]:", e)
         return None
     finally:
-        try:
-            driver.quit()
-        except Exception:
-            pass
+        if own_driver:
+            try:
+                driver.quit()
+            except Exception:
+                pass
 
 
 # Thread-safe counter for progress tracking
 class ProgressTracker:
     def __init__(self, total):
         self.total = total
-        self.completed = 0
-        self.lock = threading.Lock()
-    
-    def increment(self):
-        with self.lock:
-            self.completed += 1
-            return self.completed
-
+        # count.__next__ is a single C call, atomic under the GIL; free-threaded
+        # builds (sys._is_gil_enabled() is False) still need the lock
+        self._counter = itertools.count(1)
+        self._lock = None if getattr(sys, "_is_gil_enabled", lambda: True)() else threading.Lock()
 
-def scrape_city_wrapper(city, city_id, headless, output_root, tracker, first_scrape_date):
+    def increment(self):
+        if self._lock is None:
+            return next(self._counter)
+        with self._lock:
+            return next(self._counter)
+
+
+class RateLimiter:
+    """Thread-safe token bucket: up to capacity requests at once, refilled at capacity/period per second."""
+
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.rate = capacity / period if period and period > 0 else None
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # Take the token even if it is not there yet; waiters queue up behind the debt
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0
+        if delay > 0:
+            time.sleep(delay)
+
+
+def scrape_city_wrapper(city, city_id, pool, output_root, tracker, first_scrape_date, save_json=True, limiter=None):
     """Wrapper function for concurrent scraping."""
-    result = scrape_nowcast_svg(city, city_id=city_id, headless=headless, save_json=True, output_dir=output_root, first_scrape_date=first_scrape_date)
+    if limiter is not None:
+        limiter.acquire()
+    with pool.checkout() as driver:
+        result = scrape_nowcast_svg(city, city_id=city_id, headless=pool.headless, save_json=save_json, output_dir=output_root, first_scrape_date=first_scrape_date, driver=driver)
+        if result is None and not _driver_alive(driver):
+            # 浏览器崩溃或会话失效，丢弃后由下一个城市重新创建
+            pool.discard(driver)
     completed = tracker.increment()
     
     if result and result.get("points"):
@@ -323,17 +583,82 @@ def scrape_city_wrapper(city, city_id, headless, output_root, tracker, first_scr
     return city, result
 
 
-def scrape_all_cities_concurrent(max_workers=5, batch_size=250, sleep_between_batches=600):
-    """并发爬取所有城市的气象数据，按批次运行
+# 每个移动端模拟的 Chrome 约占 400-500MB 内存
+CHROME_RAM_BYTES = 450 * 1024 * 1024
+MAX_WORKERS_CAP = 16
+
+
+def _available_ram():
+    """可用内存字节数；没有 psutil 时先读 /proc/meminfo 的 MemAvailable，再退回 sysconf，都读不到返回 None"""
+    if psutil is not None:
+        return psutil.virtual_memory().available
+    # MemAvailable 计入可回收的页缓存，比 SC_AVPHYS_PAGES（只算空闲页）更接近实际可用内存
+    try:
+        with open("/proc/meminfo", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024  # 单位为 kB
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def _auto_workers(cap=MAX_WORKERS_CAP):
+    """按 CPU 核数和可用内存估算并发浏览器数量，限制在 [2, cap] 之间"""
+    workers = min(cap, os.cpu_count() or 4)
+    ram = _available_ram()
+    if ram:
+        workers = min(workers, int(ram // CHROME_RAM_BYTES))
+    return max(2, workers)
+
+
+CITY_LIST_CSV = 'nowcast_crawl_list_v3.csv'
+
+# (mtime_ns, name_list, id_list)：调度器进程常驻，城市列表只在文件变化时重新解析
+_CITY_CACHE = None
+
+
+def _load_cities():
+    """读取城市列表 (name_list, id_list)，文件未修改时直接复用上次的解析结果"""
+    global _CITY_CACHE
+    mtime = os.stat(CITY_LIST_CSV).st_mtime_ns
+    if _CITY_CACHE is None or _CITY_CACHE[0] != mtime:
+        df = pd.read_csv(CITY_LIST_CSV, usecols=['name', 'id'], dtype=str)
+        _CITY_CACHE = (mtime, df['name'].tolist(), df['id'].tolist())
+    return _CITY_CACHE[1], _CITY_CACHE[2]
+
+
+def write_batch_ndjson(batch_results, output_root, folder_date, batch_idx):
+    """把一组（batch_size 个）城市的结果写成一个 gzip 压缩的 NDJSON 文件（每行一个城市的结果）"""
+    outdir = output_root / "Crawled" / folder_date
+    _ensure_dir(outdir)
+    file_timestamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    fname = outdir / f"nowcast_batch{batch_idx:03d}_{file_timestamp}.jsonl.gz"
+    with gzip.open(fname, "wt", compresslevel=1, encoding="utf-8") as f:
+        f.write("".join(_dump_json_line(out) for out in batch_results))
+    print(f"Saved batch: {fname.name} ({len(batch_results)} 个城市)")
+    return fname
+
+
+def scrape_all_cities_concurrent(max_workers=None, batch_size=250, sleep_between_batches=600, batch_ndjson=False):
+    """并发爬取所有城市的气象数据，按令牌桶限速连续运行
+    
+    不再整批爬完后空等 sleep_between_batches 秒：开始时可连续放行 batch_size 个城市，
+    之后按 batch_size / sleep_between_batches 个/秒的速率放行，浏览器池全程复用。
     
     Args:
-        max_workers: 最大并发线程数，默认5个
-        batch_size: 每批城市数量，默认80；None/0 表示不分批
-        sleep_between_batches: 批次间休眠秒数，默认0秒（连续运行）
+        max_workers: 最大并发线程数，默认 None 表示按 CPU 核数和可用内存自动估算
+        batch_size: 令牌桶容量（每个限速周期的城市数），默认250；None/0 表示不限速
+        sleep_between_batches: 限速周期秒数，默认600秒；0 表示不限速
+        batch_ndjson: True 时每 batch_size 个结果写一个 .jsonl.gz 文件，不再每个城市写一个 JSON
+            （统计/分析脚本读取的是每城市一个的 JSON，默认保持不变）
     """
-    df = pd.read_csv('nowcast_crawl_list_v3.csv')
-    name_list = df['name'].tolist()
-    id_list = df['id'].tolist()
+    if max_workers is None:
+        max_workers = _auto_workers()
+    name_list, id_list = _load_cities()
     output_root = Path(__file__).parent
     first_scrape_date = datetime.now(timezone.utc).strftime("%Y%m%d%H")
 
@@ -343,34 +668,37 @@ def scrape_all_cities_concurrent(max_workers=5, batch_size=250, sleep_between_ba
 
     if not batch_size or batch_size <= 0:
         batch_size = total
-
-    total_batches = (total + batch_size - 1) // batch_size
+        limiter = None
+    else:
+        limiter = RateLimiter(batch_size, sleep_between_batches)
 
     print(f"\n{'='*60}")
     print(f"开始并发爬取任务 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"输出文件夹: {first_scrape_date}")
-    print(f"总城市数: {total}, 并发线程数: {max_workers}, 批大小: {batch_size}, 批次数: {total_batches}")
+    print(f"总城市数: {total}, 并发线程数: {max_workers}")
+    if limiter is not None and limiter.rate:
+        print(f"限速: 先放行 {batch_size} 个城市，之后每 {sleep_between_batches / batch_size:.1f} 秒一个")
     print(f"{'='*60}\n")
 
-    for batch_idx, start_idx in enumerate(range(0, total, batch_size), start=1):
-        end_idx = min(start_idx + batch_size, total)
-        batch_cities = name_list[start_idx:end_idx]
-        batch_ids = id_list[start_idx:end_idx]
-
-        print(f"-- 开始第 {batch_idx}/{total_batches} 批，城市 {start_idx+1}-{end_idx} --")
-
+    # 浏览器池在整个任务中复用，结束后全部关闭
+    pool = ChromeDriverPool(max_workers, headless=False)
+    batch_results = []
+    batch_idx = 0
+    try:
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             future_to_city = {
                 executor.submit(
                     scrape_city_wrapper,
                     city,
                     city_id,
-                    False,
+                    pool,
                     output_root,
                     tracker,
                     first_scrape_date,
+                    not batch_ndjson,
+                    limiter,
                 ): (city, city_id)
-                for city, city_id in zip(batch_cities, batch_ids)
+                for city, city_id in zip(name_list, id_list)
             }
 
             for future in as_completed(future_to_city):
@@ -378,16 +706,20 @@ def scrape_all_cities_concurrent(max_workers=5, batch_size=250, sleep_between_ba
                 try:
                     city_name, result = future.result()
                     results[city_name] = result
+                    if result:
+                        batch_results.append(result)
                 except Exception as e:
                     print(f"✗ Exception for {city_id}: {e}")
                     results[city] = None
+                if batch_ndjson and len(batch_results) >= batch_size:
+                    batch_idx += 1
+                    write_batch_ndjson(batch_results, output_root, first_scrape_date, batch_idx)
+                    batch_results = []
+    finally:
+        pool.shutdown()
 
-        print(f"-- 第 {batch_idx}/{total_batches} 批完成 --\n")
-
-        if batch_idx < total_batches:
-            minutes = sleep_between_batches / 60.0
-            print(f"批次间休眠 {minutes:.1f} 分钟...")
-            time.sleep(sleep_between_batches)
+    if batch_ndjson and batch_results:
+        write_batch_ndjson(batch_results, output_root, first_scrape_date, batch_idx + 1)
 
     print(f"\n{'='*60}")
     print(f"爬取任务完成 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -403,23 +735,26 @@ if __name__ == "__main__":
     # 设置北京时区
     beijing_tz = pytz.timezone('Asia/Shanghai')
     
+    # 并发浏览器数按本机 CPU 核数和可用内存估算
+    workers = _auto_workers()
+    
     # 使用 APScheduler 配置 UTC 时区的定时任务
     scheduler = BackgroundScheduler(timezone='UTC')
     
     # 每天 UTC 时间 0点、6点、12点、18点各执行一次
-    # scheduler.add_job(lambda: scrape_all_cities_concurrent(max_workers=3), 'cron', hour='0,6,12,18')
-    scheduler.add_job(lambda: scrape_all_cities_concurrent(max_workers=3), 'cron', hour='18')
+    # scheduler.add_job(lambda: scrape_all_cities_concurrent(max_workers=workers), 'cron', hour='0,6,12,18')
+    scheduler.add_job(lambda: scrape_all_cities_concurrent(max_workers=workers), 'cron', hour='18')
     scheduler.start()
     
     print("✓ 定时爬虫已启动（并发模式）")
     print(f"✓ 将在每天 UTC 时间 00:00, 06:00, 12:00, 18:00 执行爬取任务")
-    print(f"✓ 并发线程数: 3")
+    print(f"✓ 并发线程数: {workers}")
     print(f"✓ 当前北京时间: {datetime.now(beijing_tz).strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"✓ 当前 UTC 时间: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')}")
     print("✓ 按 Ctrl+C 停止程序\n")
     
     # 立即执行一次（可选）
-    # scrape_all_cities_concurrent(max_workers=3)
+    # scrape_all_cities_concurrent(max_workers=workers)
     
     # 持续运行调度器
     try:
@@ -6,14 +6,21 @@ Works in cycles: 20 minutes scraping, then 1 hour rest, until all cities done.
 """
 import os
 import sys
+import signal
 import subprocess
 import platform
+import shutil
+import uuid
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 import json
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import atexit
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import threading
+import itertools
+from functools import lru_cache
+from urllib.parse import quote_plus
 
 
 def _install_dependencies():
@@ -82,29 +89,204 @@ _install_dependencies()
 # Now import the required packages
 from apscheduler.schedulers.background import BackgroundScheduler
 import pandas as pd
+import gzip
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Any of these in the DOM means the weather widget (or the robot check page) has rendered
+PAGE_READY_SELECTORS = (
+    'svg[viewBox*="1440"]',
+    'div[jsname="Kt2ahd"]',
+    '[jsname="s2gQvd"]',
+    'form#captcha-form',
+)
+
+
+# Content settings / switches that cut Chrome start-up work and memory without
+# touching the DOM the scraper reads
+LIGHTWEIGHT_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+}
+LIGHTWEIGHT_ARGS = (
+    "--blink-settings=imagesEnabled=false",
+    "--disable-extensions",
+    "--disable-gpu",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--disable-translate",
+    "--disable-default-apps",
+    "--mute-audio",
+    "--disable-features=TranslateUI",
+)
+
+# Requests the scraper never needs; the nowcast SVG is inline, so URL blocking cannot touch it
+BLOCKED_URL_PATTERNS = (
+    "*.png",
+    "*.jpg",
+    "*.jpeg",
+    "*.gif",
+    "*.webp",
+    "*.woff",
+    "*.woff2",
+    "*.mp4",
+    "*://*.doubleclick.net/*",
+    "*://*.googlesyndication.com/*",
+)
+
+
+# Fused extraction script, evaluated once per city. Checks in priority order and
+# returns {kind: 'robot' | 'nowcast' | 'fallback' | 'hourly' | 'none', ...}.
+EXTRACT_JS = """
+const pageText = document.body.innerText;
+if (pageText.includes("I'm not a robot") || pageText.includes("unusual traffic")) {
+    return {kind: 'robot'};
+}
+
+// Target SVG: the first one with rects whose viewBox includes 1440 and 48
+for (const svg of document.querySelectorAll('svg')) {
+    const vb = svg.getAttribute('viewBox') || "";
+    if (!(vb.includes('1440') && vb.includes('48'))) continue;
+    const rects = svg.querySelectorAll('rect');
+    if (!rects.length) continue;
+    const rows = [];
+    for (let i = 0; i < rects.length; i++) {
+        const r = rects[i];
+        rows.push({
+            idx: i,
+            height: r.getAttribute('height') || '',
+            fill: r.getAttribute('fill') || '',
+            x: r.getAttribute('x') || '',
+            y: r.getAttribute('y') || '',
+            width: r.getAttribute('width') || ''
+        });
+    }
+    return {kind: 'nowcast', viewBox: vb, rects: rows};
+}
+
+// Fallback: div[jsname="Kt2ahd"].XhUg9e with the two summary divs
+const div = document.querySelector('div[jsname="Kt2ahd"].XhUg9e');
+if (div) {
+    const div1 = div.querySelector('.SnOHQb.tNxQIb');
+    const div2 = div.querySelector('.jz8NAf.ApHyTb');
+    if (div1 || div2) {
+        return {kind: 'fallback', data: {
+            div1_text: div1 ? div1.textContent.trim() : null,
+            div2_text: div2 ? div2.textContent.trim() : null
+        }};
+    }
+}
+
+// Third fallback: first six hourly forecast aria-labels
+const container = document.querySelector('[jsname="s2gQvd"].EDblX.HG5ZQb');
+if (!container) return {kind: 'none', reason: 'no_hourly_container'};
+const items = container.querySelectorAll('[role="listitem"][aria-label]');
+if (!items.length) return {kind: 'none', reason: 'no_hourly_items'};
+const labels = [];
+for (let i = 0; i < Math.min(6, items.length); i++) {
+    const ariaLabel = items[i].getAttribute('aria-label');
+    if (ariaLabel) labels.push(ariaLabel);
+}
+if (!labels.length) return {kind: 'none', reason: 'no_hourly_items'};
+return {kind: 'hourly', count: labels.length, labels: labels};
+"""
 
+# Resolved chromedriver path, shared by every driver this process starts.
+# Lookup order: $CHROMEDRIVER_PATH, a chromedriver on PATH, then webdriver-manager.
+_DRIVER_PATH: str | None = None
+_DRIVER_PATH_LOCK = threading.Lock()
+
+
+def _driver_binary() -> str:
+    """Resolve the chromedriver binary once per process (install() stats disk and may hit the network)."""
+    global _DRIVER_PATH
+    with _DRIVER_PATH_LOCK:
+        if _DRIVER_PATH is None:
+            _DRIVER_PATH = os.environ.get("CHROMEDRIVER_PATH") or shutil.which("chromedriver")
+        if _DRIVER_PATH is None:
+            from webdriver_manager.chrome import ChromeDriverManager
+            _DRIVER_PATH = ChromeDriverManager().install()
+        return _DRIVER_PATH
+
+
+def _rects_to_points(rows, start):
+    """Turn the JS rect rows into output points, one per 2-minute step from start."""
+    step = timedelta(minutes=2)
+    points = []
+    for row in rows:
+        idx = int(row.get("idx", 0))
+        points.append({
+            "minute_index": idx,
+            "time": (start + step * idx).strftime("%Y-%m-%d %H:%M"),
+            "height": row.get("height"),
+            "fill": row.get("fill"),
+            "x": row.get("x"),
+            "y": row.get("y"),
+            "width": row.get("width")
+        })
+    return points
+
+
+def _block_heavy_requests(driver):
+    """Block image, font, video and ad URLs at the network layer via CDP (best effort)."""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(BLOCKED_URL_PATTERNS)})
+    except Exception:
+        pass  # CDP surface differs between Chrome versions
 
-def _chrome_driver(headless: bool = True):
+
+def _chrome_driver(headless: bool = True, profile_dir: str | Path | None = None):
+    """Start Chrome; with profile_dir the user-data-dir (cookies, HTTP cache) persists across the cycles of one run."""
     from selenium import webdriver
-    from webdriver_manager.chrome import ChromeDriverManager
     from selenium.webdriver.chrome.service import Service
 
     options = webdriver.ChromeOptions()
     if headless:
         options.add_argument("--headless=new")
+    if profile_dir:
+        Path(profile_dir).mkdir(parents=True, exist_ok=True)
+        options.add_argument(f"--user-data-dir={profile_dir}")
+        options.add_argument(f"--disk-cache-size={PROFILE_DISK_CACHE_BYTES}")
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
     options.add_argument("--disable-blink-features=AutomationControlled")
     options.add_experimental_option("excludeSwitches", ["enable-automation"]) 
     options.add_experimental_option("useAutomationExtension", False)
+    options.add_experimental_option("prefs", LIGHTWEIGHT_PREFS)
+    for arg in LIGHTWEIGHT_ARGS:
+        options.add_argument(arg)
     mobile_emulation = {"deviceName": "Nexus 5"}
     options.add_experimental_option("mobileEmulation", mobile_emulation)
     options.add_argument(
         "user-agent=Mozilla/5.0 (Linux; Android 10; SM-G973F) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36"
     )
 
-    service = Service(ChromeDriverManager().install())
-    return webdriver.Chrome(service=service, options=options)
+    service = Service(_driver_binary())
+    driver = webdriver.Chrome(service=service, options=options)
+    _block_heavy_requests(driver)
+    return driver
+
+
+# Present while Google's consent dialog (or the consent.google.com form) is shown
+CONSENT_DIALOG_SELECTOR = '#L2AGLb, form[action*="consent.google"]'
+
+# Consent dialog buttons when the #L2AGLb id is missing
+CONSENT_BUTTON_XPATH = "//button//*[text()='Accept all']/..|//button//*[text()='I agree']/.."
+
+
+@lru_cache(maxsize=None)
+def _search_url(city: str) -> str:
+    """Google weather search URL for a city (cached: cities are retried across cycles and runs)."""
+    return f"https://www.google.com/search?q={quote_plus(f'weather {city}')}&hl=en&gl=us"
 
 
 def _accept_consent(driver):
@@ -120,7 +302,7 @@ def _accept_consent(driver):
         pass
     try:
         from selenium.webdriver.common.by import By
-        candidates = driver.find_elements(By.XPATH, "//button//*[text()='Accept all']/..|//button//*[text()='I agree']/..")
+        candidates = driver.find_elements(By.XPATH, CONSENT_BUTTON_XPATH)
         if candidates:
             candidates[0].click()
             time.sleep(0.3)
@@ -128,6 +310,220 @@ def _accept_consent(driver):
         pass
 
 
+def _open_google(driver):
+    """Open Google with US locale and get past consent.
+
+    Consent is granted by setting the CONSENT/SOCS cookies directly. The page
+    is then reloaded, and if Google still shows the consent dialog (cookies
+    ignored or not settable) it is clicked as before.
+    """
+    from selenium.webdriver.common.by import By
+
+    driver.get("https://www.google.com/ncr?hl=en&gl=us")
+    try:
+        for name, value in CONSENT_COOKIES:
+            driver.add_cookie({"name": name, "value": value, "domain": ".google.com", "path": "/"})
+        driver.refresh()
+    except Exception:
+        pass
+    try:
+        dialog = (driver.find_elements(By.CSS_SELECTOR, CONSENT_DIALOG_SELECTOR)
+                  or driver.find_elements(By.XPATH, CONSENT_BUTTON_XPATH))
+    except Exception:
+        dialog = True  # Could not tell: fall back to the click path
+    if dialog:
+        _accept_consent(driver)
+
+
+def _dump_json(obj) -> bytes:
+    """Serialize to indented UTF-8 JSON; orjson when available, else the stdlib."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _dump_json_line(obj) -> str:
+    """One compact NDJSON line (trailing newline included)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _save_result(out, crawled_dir: Path, city_id, file_timestamp) -> Path:
+    """Write one scrape result to <crawled_dir>/nowcast_<city_id>_<file_timestamp>.json."""
+    fname = crawled_dir / f"nowcast_{city_id}_{file_timestamp}.json"
+    fname.write_bytes(_dump_json(out))
+    return fname
+
+
+# Page-source snapshots: zstd when zstandard is installed, else gzip (both ~5-10x smaller)
+HTML_ZSTD_LEVEL = 9
+_zstd_local = threading.local()  # ZstdCompressor instances must not be shared between threads
+
+
+def _html_suffix() -> str:
+    return ".zst" if zstandard is not None else ".gz"
+
+
+def _compress_html(html: str) -> bytes:
+    data = html.encode("utf-8")
+    if zstandard is None:
+        return gzip.compress(data, compresslevel=6)
+    cctx = getattr(_zstd_local, "cctx", None)
+    if cctx is None:
+        cctx = _zstd_local.cctx = zstandard.ZstdCompressor(level=HTML_ZSTD_LEVEL)
+    return cctx.compress(data)
+
+
+def read_html_snapshot(path) -> str:
+    """Read a GoogleNowcastHTML snapshot written by this script (.html, .html.gz or .html.zst)."""
+    path = Path(path)
+    data = path.read_bytes()
+    if path.suffix == ".zst":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read " + path.name)
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif path.suffix == ".gz":
+        data = gzip.decompress(data)
+    return data.decode("utf-8")
+
+
+# Cookies Google sets once its consent dialog has been accepted
+CONSENT_COOKIES = (("CONSENT", "YES+cb"), ("SOCS", "CAI"))
+
+# Chrome profiles: PROFILE_ROOT/<pid>-<run token>/<worker slot>, kept for the whole run
+# (all its cycles) and removed when the run ends
+PROFILE_ROOT = Path.home() / ".cache" / "nowcast_chrome"
+PROFILE_DISK_CACHE_BYTES = 256 * 1024 * 1024
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True  # exists but not ours, or cannot tell: leave it alone
+    return True
+
+
+def _remove_stale_profiles():
+    """Delete run profiles left behind by processes that no longer exist (e.g. after a crash)."""
+    try:
+        entries = list(PROFILE_ROOT.iterdir())
+    except OSError:
+        return
+    for entry in entries:
+        pid, sep, _ = entry.name.partition("-")
+        if sep and pid.isdigit() and int(pid) != os.getpid() and not _pid_alive(int(pid)):
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+class WorkerBrowserPool:
+    """Browsers of one scrape_all_cities_concurrent run: one per worker thread.
+
+    Each worker thread reuses its browser across the cities it handles;
+    quit_all() closes only this run's browsers, so an overlapping run (the
+    immediate run and the scheduled job) keeps its own.
+    """
+
+    def __init__(self, headless=True):
+        self.headless = headless
+        # Unique per process and run: overlapping runs reuse the worker thread names
+        # (nowcast_0..N-1), and Chrome refuses a user-data-dir that is already in use
+        _remove_stale_profiles()
+        self.profile_root = PROFILE_ROOT / f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        self._drivers = []
+        self._lock = threading.Lock()
+        with _live_pools_lock:
+            _live_pools.add(self)
+
+    def get(self):
+        """Return this thread's browser, creating it (and passing consent) on first use or after session loss."""
+        driver = getattr(self._local, "driver", None)
+        if driver is not None and driver.session_id is None:
+            self.discard()
+            driver = None
+        if driver is None:
+            # Profile per worker slot (thread names are nowcast_0..nowcast_N-1 in every cycle),
+            # so the cache stays warm between the cycles of this run
+            profile_dir = self.profile_root / threading.current_thread().name
+            driver = _chrome_driver(headless=self.headless, profile_dir=profile_dir)
+            try:
+                _open_google(driver)
+            except Exception:
+                # Not pooled yet: quit it here, or it keeps the profile locked for this slot
+                driver.quit()
+                raise
+            self._local.driver = driver
+            with self._lock:
+                self._drivers.append(driver)
+        return driver
+
+    def discard(self):
+        """Quit and forget this thread's browser so the next city starts a fresh one."""
+        driver = getattr(self._local, "driver", None)
+        if driver is None:
+            return
+        self._local.driver = None
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def quit_all(self):
+        """Quit this run's browsers (called when a work cycle's thread pool has shut down)."""
+        with self._lock:
+            drivers = list(self._drivers)
+            self._drivers.clear()
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    def close(self):
+        self.quit_all()
+        shutil.rmtree(self.profile_root, ignore_errors=True)
+        with _live_pools_lock:
+            _live_pools.discard(self)
+
+
+# Pools of the runs currently in progress, closed at interpreter exit
+_live_pools = set()
+_live_pools_lock = threading.Lock()
+
+
+def _close_live_pools():
+    with _live_pools_lock:
+        pools = list(_live_pools)
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(_close_live_pools)
+
+
+def _driver_alive(driver) -> bool:
+    try:
+        driver.current_url
+        return True
+    except Exception:
+        return False
+
+
+# Set by SIGINT/SIGTERM: stops submitting new cities and cuts the rest period short
+_stop_event = threading.Event()
+
+
+def _request_stop(signum, frame):
+    print(f"\n收到信号 {signum}，正在停止...")
+    _stop_event.set()
+
+
 def scrape_nowcast_svg(
     city: str = "Fairfax, California, United States",
     city_id: str = "",
@@ -135,8 +531,20 @@ def scrape_nowcast_svg(
     save_json: bool = True,
     output_dir: str | Path | None = None,
     first_scrape_date: str | None = None,
+    driver=None,
+    crawled_dir: Path | None = None,
+    html_dir: Path | None = None,
+    save_html: bool = False,
 ):
-    """Scrape rect heights from the SVG whose viewBox includes 1440 and 48."""
+    """Scrape rect heights from the SVG whose viewBox includes 1440 and 48.
+
+    If driver is given it is reused (consent already handled) and left open;
+    otherwise a fresh browser is started and quit afterwards. crawled_dir and
+    html_dir are the (already created) output folders of the current run; when
+    omitted they are derived from output_dir and created here. With save_html
+    the compressed page source is kept as GoogleNowcastHTML/<date>/<id>_<date>.html.zst
+    (or .gz), for debugging.
+    """
     try:
         from selenium.webdriver.common.by import By
         from selenium.webdriver.support.ui import WebDriverWait
@@ -146,163 +554,91 @@ def scrape_nowcast_svg(
         return None
 
     base_dir = Path(output_dir) if output_dir else Path(__file__).parent
+    # Read the clock once: scrape_time, the file name stamp and the default folder all derive from it
+    scrape_now = datetime.now(timezone.utc)
+    stamp = scrape_now.strftime("%Y%m%d%H%M%S")
+    folder_date = first_scrape_date if first_scrape_date else stamp[:10]
+    if crawled_dir is None:
+        crawled_dir = base_dir / "Crawled" / folder_date
+        if save_json:
+            crawled_dir.mkdir(parents=True, exist_ok=True)
+    if html_dir is None and save_html:
+        html_dir = base_dir / "GoogleNowcastHTML" / folder_date
+        html_dir.mkdir(parents=True, exist_ok=True)
 
     out = {
         "city": city,
         "city_id": city_id,
-        "scrape_time": datetime.now(timezone.utc).isoformat(),
+        "scrape_time": scrape_now.isoformat(),
         "type": None,
         "viewBox": None,
         "points": []
     }
 
-    driver = _chrome_driver(headless=headless)
+    own_driver = driver is None
+    if own_driver:
+        driver = _chrome_driver(headless=headless)
     try:
-        driver.get("https://www.google.com/ncr?hl=en&gl=us")
-        _accept_consent(driver)
+        if own_driver:
+            _open_google(driver)
 
-        from urllib.parse import quote_plus
-        q = quote_plus(f"weather {city}")
-        driver.get(f"https://www.google.com/search?q={q}&hl=en&gl=us")
+        driver.get(_search_url(city))
 
-        time.sleep(3)
-        
-        # Save HTML page
+        # Continue as soon as the nowcast SVG, the fallback div, the hourly list or
+        # Google's captcha form is in the DOM (5 s cap instead of a fixed 3 s sleep)
         try:
-            html_content = driver.page_source
-            folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
-            html_dir = base_dir / "GoogleNowcastHTML" / folder_date
-            html_dir.mkdir(parents=True, exist_ok=True)
-            html_filename = f"{city_id}_{folder_date}.html"
-            html_path = html_dir / html_filename
-            html_path.write_text(html_content, encoding="utf-8")
-            print(f"[{city}] Saved HTML: {html_filename}")
-        except Exception as e:
-            print(f"[{city}] Warning: Could not save HTML: {e}")
+            WebDriverWait(driver, 5).until(EC.any_of(*(
+                EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+                for selector in PAGE_READY_SELECTORS
+            )))
+        except Exception:
+            time.sleep(0.5)  # Timed out: short grace period, then let the probes report what is missing
+        
+        # Save HTML page (opt-in: page_source is the largest chromedriver payload per city)
+        if save_html:
+            try:
+                html_content = driver.page_source
+                html_filename = f"{city_id}_{folder_date}.html" + _html_suffix()
+                html_path = html_dir / html_filename
+                html_path.write_bytes(_compress_html(html_content))
+                print(f"[{city}] Saved HTML: {html_filename}")
+            except Exception as e:
+                print(f"[{city}] Warning: Could not save HTML: {e}")
         
-        # Check for reCAPTCHA robot verification
-        check_robot_js = """
-        const pageText = document.body.innerText;
-        const hasRobotCheck = pageText.includes("I'm not a robot") || pageText.includes("unusual traffic");
-        return hasRobotCheck;
-        """
-        is_robot_check = driver.execute_script(check_robot_js)
-        if is_robot_check:
+        # One round-trip: robot check, target SVG, fallback div and hourly probe
+        result = driver.execute_script(EXTRACT_JS) or {"kind": "none", "reason": "unknown"}
+        kind = result.get("kind")
+        if kind == "robot":
             print("⚠ reCAPTCHA verification detected: 'I'm not a robot'")
             out["type"] = "robot"
             if save_json:
-                folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
-                file_timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
-                outdir = base_dir / "Crawled" / folder_date
-                outdir.mkdir(parents=True, exist_ok=True)
-                fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
-                fname.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
+                fname = _save_result(out, crawled_dir, city_id, f"{stamp[:8]}_{stamp[8:]}")
                 print("Saved:", fname)
             return out
 
-        js = """
-        const all = document.querySelectorAll('svg');
-        const withRects = [];
-        for (const svg of all) {
-            const rects = svg.querySelectorAll('rect');
-            if (rects.length) {
-                withRects.push({svg, viewBox: svg.getAttribute('viewBox'), rectCount: rects.length});
-            }
-        }
-        let target = null;
-        for (const info of withRects) {
-            const vb = (info.viewBox || "");
-            if (vb.includes('1440') && vb.includes('48')) { target = info; break; }
-        }
-        if (!target) {
-            return {found:false, sample: withRects.slice(0, 10)};
-        }
-        const rects = target.svg.querySelectorAll('rect');
-        const rows = [];
-        for (let i=0;i<rects.length;i++){
-            const r = rects[i];
-            rows.push({
-                idx:i,
-                height: r.getAttribute('height')||'',
-                fill: r.getAttribute('fill')||'',
-                x: r.getAttribute('x')||'',
-                y: r.getAttribute('y')||'',
-                width: r.getAttribute('width')||''
-            });
-        }
-        return {found:true, viewBox: target.viewBox, rects: rows};
-        """
-
-        result = driver.execute_script(js)
-        if not result or not result.get("found"):
+        if kind != "nowcast":
             print(f"[{city}] No target SVG found. Trying fallback div...")
-            fallback_js = """
-            const div = document.querySelector('div[jsname="Kt2ahd"].XhUg9e');
-            if (!div) return {found: false, reason: 'no_kt2ahd_div'};
-            const div1 = div.querySelector('.SnOHQb.tNxQIb');
-            const div2 = div.querySelector('.jz8NAf.ApHyTb');
-            if (!div1 && !div2) return {found: false, reason: 'no_target_divs'};
-            const data = {
-                div1_text: div1 ? div1.textContent.trim() : null,
-                div2_text: div2 ? div2.textContent.trim() : null
-            };
-            return {found: true, source: 'fallback_div', data: data};
-            """
-            
-            fallback_result = driver.execute_script(fallback_js)
-            if fallback_result and fallback_result.get("found"):
-                print(f"[{city}] Fallback OK: found divs")
-                out["fallback_data"] = fallback_result.get("data")
-                out["source"] = "fallback_div"
-                out["type"] = "nowcast"
+        if kind == "fallback":
+            print(f"[{city}] Fallback OK: found divs")
+            out["fallback_data"] = result.get("data")
+            out["source"] = "fallback_div"
+            out["type"] = "nowcast"
+            result = {"viewBox": None, "rects": []}
+        elif kind != "nowcast":
+            print(f"[{city}] Fallback div not found. Trying hourly forecast...")
+            if kind == "hourly":
+                print(f"[{city}] Hourly forecast OK: {result.get('count', 0)} items")
+                out["hourly_data"] = result.get("labels", [])
+                out["source"] = "hourly_aria_label"
+                out["type"] = "hourly"
                 result = {"viewBox": None, "rects": []}
             else:
-                print(f"[{city}] Fallback div not found. Trying hourly forecast...")
-                hourly_js = """
-                const container = document.querySelector('[jsname="s2gQvd"].EDblX.HG5ZQb');
-                if (!container) return { found: false, reason: 'no_hourly_container' };
-                const items = container.querySelectorAll('[role="listitem"][aria-label]');
-                if (!items || items.length === 0) {
-                    return { found: false, reason: 'no_hourly_items' };
-                }
-                const labels = [];
-                for (let i = 0; i < Math.min(6, items.length); i++) {
-                    const ariaLabel = items[i].getAttribute('aria-label');
-                    if (ariaLabel) labels.push(ariaLabel);
-                }
-                return { found: labels.length > 0, count: labels.length, labels: labels };
-                """
-                
-                hourly_result = driver.execute_script(hourly_js)
-                if hourly_result and hourly_result.get("found"):
-                    print(f"[{city}] Hourly forecast OK: {hourly_result.get('count', 0)} items")
-                    out["hourly_data"] = hourly_result.get("labels", [])
-                    out["source"] = "hourly_aria_label"
-                    out["type"] = "hourly"
-                    result = {"viewBox": None, "rects": []}
-                else:
-                    html = driver.page_source
-                    dbg = base_dir / f"debug_nowcast_{city.split(',')[0].replace(' ', '_')}.html"
-                    dbg.write_text(html, encoding="utf-8")
-                    reason = hourly_result.get('reason') if hourly_result else 'unknown'
-                    print(f"[{city}] No data found (reason: {reason}). Wrote {dbg.name}")
-                    # Delete debug file after saving
-                    try:
-                        import time as time_module
-                        time_module.sleep(0.5)  # Brief delay to ensure file is written
-                        dbg.unlink()  # Delete the file
-                        print(f"[{city}] Debug file deleted: {dbg.name}")
-                    except Exception as del_err:
-                        print(f"[{city}] Could not delete debug file: {del_err}")
-                    out["message"] = "no nowcast data now."
-                    if save_json:
-                        folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
-                        file_timestamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
-                        outdir = base_dir / "Crawled" / folder_date
-                        outdir.mkdir(parents=True, exist_ok=True)
-                        fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
-                        fname.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
-                    return out
+                reason = result.get('reason', 'unknown')
+                print(f"[{city}] No data found (reason: {reason}).")
+                out["message"] = "no nowcast data now."
+                if save_json:
+                    _save_result(out, crawled_dir, city_id, stamp)
+                return out
 
         out["viewBox"] = result.get("viewBox")
         if result.get("source"):
@@ -310,45 +646,14 @@ def scrape_nowcast_svg(
         if not out["type"]:
             out["type"] = "nowcast"
         rows = result.get("rects") or []
-        start = datetime.fromisoformat(out["scrape_time"])
+        start = scrape_now
         # If minute is odd, subtract 1 minute to make it even
         if start.minute % 2 == 1:
             start = start - timedelta(minutes=1)
-        for row in rows:
-            t = start + timedelta(minutes=int(row.get("idx", 0)) * 2)
-            out["points"].append({
-                "minute_index": int(row.get("idx", 0)),
-                "time": t.strftime("%Y-%m-%d %H:%M"),
-                "height": row.get("height"),
-                "fill": row.get("fill"),
-                "x": row.get("x"),
-                "y": row.get("y"),
-                "width": row.get("width")
-            })
-
-        if save_json and out["points"]:
-            folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
-            file_timestamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
-            outdir = base_dir / "Crawled" / folder_date
-            outdir.mkdir(parents=True, exist_ok=True)
-            fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
-            fname.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
-            print(f"[{city}] Saved: {fname.name}")
-        elif save_json and out.get("fallback_data"):
-            folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
-            file_timestamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
-            outdir = base_dir / "Crawled" / folder_date
-            outdir.mkdir(parents=True, exist_ok=True)
-            fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
-            fname.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
-            print(f"[{city}] Saved: {fname.name}")
-        elif save_json and out.get("hourly_data"):
-            folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
-            file_timestamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
-            outdir = base_dir / "Crawled" / folder_date
-            outdir.mkdir(parents=True, exist_ok=True)
-            fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
-            fname.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
+        out["points"] = _rects_to_points(rows, start)
+
+        if save_json and (out["points"] or out.get("fallback_data") or out.get("hourly_data")):
+            fname = _save_result(out, crawled_dir, city_id, stamp)
             print(f"[{city}] Saved: {fname.name}")
 
         return out
@@ -357,28 +662,38 @@ def scrape_nowcast_svg(
         print(f"ERR [{city}]:", e)
         return None
     finally:
-        try:
-            driver.quit()
-        except Exception:
-            pass
+        if own_driver:
+            try:
+                driver.quit()
+            except Exception:
+                pass
 
 
 # Thread-safe counter for progress tracking
 class ProgressTracker:
     def __init__(self, total):
         self.total = total
-        self.completed = 0
-        self.lock = threading.Lock()
-    
-    def increment(self):
-        with self.lock:
-            self.completed += 1
-            return self.completed
-
+        # count.__next__ is a single C call, atomic under the GIL; free-threaded
+        # builds (sys._is_gil_enabled() is False) still need the lock
+        self._counter = itertools.count(1)
+        self._lock = None if getattr(sys, "_is_gil_enabled", lambda: True)() else threading.Lock()
 
-def scrape_city_wrapper(city, city_id, headless, output_root, tracker, first_scrape_date):
-    """Wrapper function for concurrent scraping."""
-    result = scrape_nowcast_svg(city, city_id=city_id, headless=headless, save_json=True, output_dir=output_root, first_scrape_date=first_scrape_date)
+    def increment(self):
+        if self._lock is None:
+            return next(self._counter)
+        with self._lock:
+            return next(self._counter)
+
+
+def scrape_city_wrapper(city, city_id, pool, output_root, tracker, first_scrape_date, save_json=True,
+                        crawled_dir=None, html_dir=None, save_html=False):
+    """Wrapper function for concurrent scraping (reuses the worker thread's browser from pool)."""
+    driver = pool.get()
+    result = scrape_nowcast_svg(city, city_id=city_id, headless=pool.headless, save_json=save_json, output_dir=output_root, first_scrape_date=first_scrape_date, driver=driver,
+                                crawled_dir=crawled_dir, html_dir=html_dir, save_html=save_html)
+    if result is None and not _driver_alive(driver):
+        # 浏览器崩溃或会话失效时丢弃，下一个城市重新创建
+        pool.discard()
     completed = tracker.increment()
     
     if result and result.get("points"):
@@ -393,7 +708,20 @@ def scrape_city_wrapper(city, city_id, headless, output_root, tracker, first_scr
     return city, result
 
 
-def scrape_all_cities_concurrent(base_dir, csv_file='nowcast_crawl_list_v3.csv', max_workers=5, work_duration_minutes=20, rest_duration_minutes=60):
+def write_cycle_ndjson(cycle_results, crawled_dir, cycle_num):
+    """把一轮工作周期的结果一次性写入 Crawled/<folder_date>/nowcast_cycle<n>.ndjson（每行一个城市）
+    
+    crawled_dir 由 scrape_all_cities_concurrent 在每轮开始时创建
+    """
+    fname = crawled_dir / f"nowcast_cycle{cycle_num}.ndjson"
+    lines = "".join(_dump_json_line(out) for out in cycle_results)
+    with open(fname, "a", encoding="utf-8") as f:
+        f.write(lines)
+    print(f"Saved cycle: {fname.name} ({len(cycle_results)} 个城市)")
+    return fname
+
+
+def scrape_all_cities_concurrent(base_dir, csv_file='nowcast_crawl_list_v3.csv', max_workers=5, work_duration_minutes=20, rest_duration_minutes=60, save_per_city=True, save_html=False):
     """并发爬取所有城市的气象数据，工作/休息循环模式
     
     Args:
@@ -402,6 +730,9 @@ def scrape_all_cities_concurrent(base_dir, csv_file='nowcast_crawl_list_v3.csv',
         max_workers: 最大并发线程数，默认5个
         work_duration_minutes: 工作时长（分钟），默认20分钟
         rest_duration_minutes: 休息时长（分钟），默认60分钟
+        save_per_city: 默认每个城市写一个 JSON（统计/分析脚本读取这些文件）；
+            False 时每轮只写一个 nowcast_cycle<n>.ndjson
+        save_html: 是否额外保存每个城市的网页源码（调试用，默认不保存）
     """
     df = pd.read_csv(csv_file)
     name_list = df['name'].tolist()
@@ -425,124 +756,151 @@ def scrape_all_cities_concurrent(base_dir, csv_file='nowcast_crawl_list_v3.csv',
     pending_cities = list(zip(name_list, id_list))  # 待爬取的城市队列
     cycle_num = 1
     
-    while pending_cities:
-        cycle_start = datetime.now(timezone.utc)
-        window_end = cycle_start + work_duration
+    # 本次任务自己的浏览器池：与同时运行的其他任务（立即执行 / 定时任务）互不影响
+    pool = WorkerBrowserPool(headless=False)
+    try:
+        while pending_cities:
+            cycle_start = datetime.now(timezone.utc)
+            window_end = cycle_start + work_duration
         
-        print(f"\n{'='*60}")
-        print(f"【第 {cycle_num} 轮工作周期开始】")
-        print(f"开始时间: {cycle_start.strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"预计结束: {window_end.strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"剩余城市: {len(pending_cities)}/{total}")
-        print(f"{'='*60}\n")
+            print(f"\n{'='*60}")
+            print(f"【第 {cycle_num} 轮工作周期开始】")
+            print(f"开始时间: {cycle_start.strftime('%Y-%m-%d %H:%M:%S')}")
+            print(f"预计结束: {window_end.strftime('%Y-%m-%d %H:%M:%S')}")
+            print(f"剩余城市: {len(pending_cities)}/{total}")
+            print(f"{'='*60}\n")
         
-        # 在本轮工作窗口内并发爬取
-        cycle_results = []
-        executor = ThreadPoolExecutor(max_workers=max_workers)
-        futures_dict = {}
-        completed_in_cycle = []
+            # 本轮输出目录只创建一次，各城市直接写入
+            crawled_dir = output_root / "Crawled" / first_scrape_date
+            html_dir = output_root / "GoogleNowcastHTML" / first_scrape_date
+            crawled_dir.mkdir(parents=True, exist_ok=True)
+            if save_html:
+                html_dir.mkdir(parents=True, exist_ok=True)
         
-        # 动态提交任务，在工作窗口内控制提交数量
-        city_index = 0
+            # 在本轮工作窗口内并发爬取
+            cycle_results = []
+            executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="nowcast")
+            futures_dict = {}
+            completed_in_cycle = set()
         
-        # 先提交第一批任务（max_workers个）
-        while city_index < len(pending_cities) and city_index < max_workers:
-            city, city_id = pending_cities[city_index]
-            future = executor.submit(
-                scrape_city_wrapper,
-                city,
-                city_id,
-                False,
-                output_root,
-                tracker,
-                first_scrape_date
-            )
-            futures_dict[future] = (city, city_id)
-            city_index += 1
+            # 动态提交任务，在工作窗口内控制提交数量
+            city_index = 0
         
-        # 收集完成的任务，在工作窗口内继续提交新任务
-        # 使用while循环动态处理futures，而不是for循环
-        while futures_dict:
-            # 等待任意一个任务完成
-            done_futures = []
-            try:
-                for future in as_completed(futures_dict, timeout=1):
-                    done_futures.append(future)
-                    break  # 只处理一个，然后检查时间和提交新任务
-            except Exception:
-                # timeout或其他异常，继续等待
-                pass
-            
-            if not done_futures:
-                continue
-            
-            future = done_futures[0]
-            city, city_id = futures_dict.pop(future)  # 从字典中移除已完成的
-            
-            try:
-                city_name, result = future.result()
-                results[city_name] = result
-                completed_in_cycle.append((city, city_id))
-            except Exception as e:
-                print(f"✗ Exception for {city_id}: {e}")
-                results[city] = None
-                completed_in_cycle.append((city, city_id))
-            
-            # 检查是否超过工作窗口
-            if datetime.now(timezone.utc) >= window_end:
-                print(f"\n⏰ 工作窗口已到 {work_duration_minutes} 分钟，停止提交新任务...")
-                break
-            
-            # 如果还有待处理城市，继续提交新任务
-            if city_index < len(pending_cities):
+            # 先提交第一批任务（max_workers个）
+            while city_index < len(pending_cities) and city_index < max_workers:
                 city, city_id = pending_cities[city_index]
-                new_future = executor.submit(
+                future = executor.submit(
                     scrape_city_wrapper,
                     city,
                     city_id,
-                    False,
+                    pool,
                     output_root,
                     tracker,
-                    first_scrape_date
+                    first_scrape_date,
+                    save_per_city,
+                    crawled_dir,
+                    html_dir,
+                    save_html
                 )
-                futures_dict[new_future] = (city, city_id)
+                futures_dict[future] = (city, city_id)
                 city_index += 1
         
-        # 关闭线程池，不再接受新任务，但等待已提交的任务完成
-        print(f"\n等待本轮剩余任务完成...")
-        executor.shutdown(wait=True)
+            # 收集完成的任务，在工作窗口内继续提交新任务
+            # wait(FIRST_COMPLETED) 在有任务完成或工作窗口结束时立即返回，不再按1秒轮询
+            while futures_dict:
+                remaining = (window_end - datetime.now(timezone.utc)).total_seconds()
+                if remaining > 0:
+                    done, _ = wait(futures_dict, timeout=remaining, return_when=FIRST_COMPLETED)
+                else:
+                    done = ()
+            
+                for future in done:
+                    city, city_id = futures_dict.pop(future)  # 从字典中移除已完成的
+                    try:
+                        city_name, result = future.result()
+                        results[city_name] = result
+                        if result:
+                            cycle_results.append(result)
+                    except Exception as e:
+                        print(f"✗ Exception for {city_id}: {e}")
+                        results[city] = None
+                    completed_in_cycle.add((city, city_id))
+            
+                # 检查是否超过工作窗口或收到停止信号
+                if datetime.now(timezone.utc) >= window_end:
+                    print(f"\n⏰ 工作窗口已到 {work_duration_minutes} 分钟，停止提交新任务...")
+                    break
+                if _stop_event.is_set():
+                    print("\n停止信号已收到，不再提交新任务...")
+                    break
+            
+                # 如果还有待处理城市，补满空闲的线程
+                while city_index < len(pending_cities) and len(futures_dict) < max_workers:
+                    city, city_id = pending_cities[city_index]
+                    new_future = executor.submit(
+                        scrape_city_wrapper,
+                        city,
+                        city_id,
+                        pool,
+                        output_root,
+                        tracker,
+                        first_scrape_date,
+                        save_per_city,
+                        crawled_dir,
+                        html_dir,
+                        save_html
+                    )
+                    futures_dict[new_future] = (city, city_id)
+                    city_index += 1
+        
+            # 关闭线程池，不再接受新任务，但等待已提交的任务完成
+            print(f"\n等待本轮剩余任务完成...")
+            executor.shutdown(wait=True)
+            # 工作线程随线程池结束，本轮的浏览器在休息前全部关闭（只关闭本次任务的浏览器）
+            pool.quit_all()
+        
+            # 收集剩余未处理的结果（如果有的话）
+            for future, (city, city_id) in list(futures_dict.items()):
+                if (city, city_id) not in completed_in_cycle:
+                    try:
+                        city_name, result = future.result(timeout=0)
+                        results[city_name] = result
+                        if result:
+                            cycle_results.append(result)
+                        completed_in_cycle.add((city, city_id))
+                    except Exception as e:
+                        print(f"✗ Exception for {city_id}: {e}")
+                        results[city] = None
+                        completed_in_cycle.add((city, city_id))
         
-        # 收集剩余未处理的结果（如果有的话）
-        for future, (city, city_id) in list(futures_dict.items()):
-            if (city, city_id) not in completed_in_cycle:
-                try:
-                    city_name, result = future.result(timeout=0)
-                    results[city_name] = result
-                    completed_in_cycle.append((city, city_id))
-                except Exception as e:
-                    print(f"✗ Exception for {city_id}: {e}")
-                    results[city] = None
-                    completed_in_cycle.append((city, city_id))
+            if not save_per_city and cycle_results:
+                write_cycle_ndjson(cycle_results, crawled_dir, cycle_num)
         
-        # 从待处理队列中移除已完成的城市
-        pending_cities = [(c, cid) for c, cid in pending_cities if (c, cid) not in completed_in_cycle]
+            # 从待处理队列中移除已完成的城市
+            pending_cities = [(c, cid) for c, cid in pending_cities if (c, cid) not in completed_in_cycle]
         
-        cycle_end = datetime.now(timezone.utc)
-        cycle_duration = (cycle_end - cycle_start).total_seconds() / 60
+            cycle_end = datetime.now(timezone.utc)
+            cycle_duration = (cycle_end - cycle_start).total_seconds() / 60
         
-        print(f"\n{'='*60}")
-        print(f"【第 {cycle_num} 轮工作周期结束】")
-        print(f"实际运行: {cycle_duration:.1f} 分钟")
-        print(f"本轮完成: {len(completed_in_cycle)} 个城市")
-        print(f"总进度: {tracker.completed}/{total} ({tracker.completed/total*100:.1f}%)")
-        print(f"{'='*60}\n")
+            print(f"\n{'='*60}")
+            print(f"【第 {cycle_num} 轮工作周期结束】")
+            print(f"实际运行: {cycle_duration:.1f} 分钟")
+            print(f"本轮完成: {len(completed_in_cycle)} 个城市")
+            done_total = total - len(pending_cities)
+            print(f"总进度: {done_total}/{total} ({done_total/total*100:.1f}%)")
+            print(f"{'='*60}\n")
         
-        # 如果还有待处理城市，休息后继续
-        if pending_cities:
-            print(f"💤 休息 {rest_duration_minutes} 分钟后继续下一轮...")
-            print(f"下轮预计开始时间: {(datetime.now(timezone.utc) + rest_duration).strftime('%Y-%m-%d %H:%M:%S')}\n")
-            time.sleep(rest_duration.total_seconds())
-            cycle_num += 1
+            # 如果还有待处理城市，休息后继续
+            if pending_cities:
+                print(f"💤 休息 {rest_duration_minutes} 分钟后继续下一轮...")
+                print(f"下轮预计开始时间: {(datetime.now(timezone.utc) + rest_duration).strftime('%Y-%m-%d %H:%M:%S')}\n")
+                # 用 Event 等待代替 sleep，收到停止信号时立即结束休息
+                if _stop_event.wait(rest_duration.total_seconds()):
+                    break
+                cycle_num += 1
+    
+    finally:
+        pool.close()
     
     print(f"\n{'='*60}")
     print(f"爬取任务完成 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -554,14 +912,29 @@ def scrape_all_cities_concurrent(base_dir, csv_file='nowcast_crawl_list_v3.csv',
 
 
 if __name__ == "__main__":
+    import argparse
     import pytz
     
-    # 定义配置参数
+    # 定义配置参数：命令行参数 > 环境变量 > 默认值
+    # 并发数默认按 CPU 核数，最多 8 个浏览器（再多容易触发 reCAPTCHA）
+    parser = argparse.ArgumentParser(description="Google nowcast 循环爬虫（工作/休息模式）")
+    parser.add_argument("--max-workers", type=int,
+                        default=int(os.environ.get("NOWCAST_MAX_WORKERS", min(8, os.cpu_count() or 2))))
+    parser.add_argument("--work-minutes", type=int, default=int(os.environ.get("NOWCAST_WORK_MIN", 20)))
+    parser.add_argument("--rest-minutes", type=int, default=int(os.environ.get("NOWCAST_REST_MIN", 60)))
+    parser.add_argument("--save-html", action="store_true", help="额外保存每个城市的网页源码（调试用）")
+    args = parser.parse_args()
+    
     CSV_FILE = 'nowcast_crawl_list_v3.csv'
-    MAX_WORKERS = 3
+    MAX_WORKERS = max(1, args.max_workers)
     BASE_DIR = Path(__file__).parent
-    WORK_MINUTES = 20  # 工作时长：20分钟
-    REST_MINUTES = 60  # 休息时长：60分钟
+    WORK_MINUTES = args.work_minutes  # 工作时长：默认20分钟
+    REST_MINUTES = args.rest_minutes  # 休息时长：默认60分钟
+    SAVE_HTML = args.save_html  # 默认不保存网页源码
+    
+    # Ctrl+C / SIGTERM 只设置停止标志：当前任务收尾后退出，休息期立即结束
+    signal.signal(signal.SIGINT, _request_stop)
+    signal.signal(signal.SIGTERM, _request_stop)
     
     # 设置北京时区
     beijing_tz = pytz.timezone('Asia/Shanghai')
@@ -576,7 +949,8 @@ if __name__ == "__main__":
             csv_file=CSV_FILE, 
             max_workers=MAX_WORKERS,
             work_duration_minutes=WORK_MINUTES,
-            rest_duration_minutes=REST_MINUTES
+            rest_duration_minutes=REST_MINUTES,
+            save_html=SAVE_HTML
         ), 
         'cron', 
         hour='18'
@@ -599,13 +973,11 @@ if __name__ == "__main__":
         csv_file=CSV_FILE, 
         max_workers=MAX_WORKERS,
         work_duration_minutes=WORK_MINUTES,
-        rest_duration_minutes=REST_MINUTES
+        rest_duration_minutes=REST_MINUTES,
+        save_html=SAVE_HTML
     )
     
-    # 持续运行调度器
-    try:
-        while True:
-            time.sleep(60)
-    except KeyboardInterrupt:
-        print("\n\n程序已停止")
-        scheduler.shutdown()
+    # 持续运行调度器，直到收到 SIGINT/SIGTERM
+    _stop_event.wait()
+    print("\n\n程序已停止")
+    scheduler.shutdown()
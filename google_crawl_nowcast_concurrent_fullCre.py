@@ -13,6 +13,9 @@ import json
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
+import itertools
+import queue
+from contextlib import contextmanager
 
 
 def _install_dependencies():
@@ -82,10 +85,93 @@ _install_dependencies()
 from apscheduler.schedulers.background import BackgroundScheduler
 import pandas as pd
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Any of these in the DOM means the weather widget (or the robot check page) has rendered
+PAGE_READY_SELECTORS = (
+    'svg[viewBox*="1440"]',
+    'div[jsname="Kt2ahd"]',
+    '[jsname="s2gQvd"]',
+    'form#captcha-form',
+)
+
+# Fused extraction script, evaluated once per city. Checks in priority order and
+# returns {kind: 'robot' | 'nowcast' | 'fallback' | 'hourly' | 'none', ...}.
+EXTRACT_JS = """
+const pageText = document.body.innerText;
+if (pageText.includes("I'm not a robot") || pageText.includes("unusual traffic")) {
+    return {kind: 'robot'};
+}
+
+// Target SVG: the first one with rects whose viewBox includes 1440 and 48
+for (const svg of document.querySelectorAll('svg')) {
+    const vb = svg.getAttribute('viewBox') || "";
+    if (!(vb.includes('1440') && vb.includes('48'))) continue;
+    const rects = svg.querySelectorAll('rect');
+    const n = rects.length;
+    if (!n) continue;
+    // Columnar result: five flat string arrays instead of one object per rect
+    const heights = new Array(n), fills = new Array(n), xs = new Array(n), ys = new Array(n), widths = new Array(n);
+    for (let i = 0; i < n; i++) {
+        const r = rects[i];
+        heights[i] = r.getAttribute('height') || '';
+        fills[i] = r.getAttribute('fill') || '';
+        xs[i] = r.getAttribute('x') || '';
+        ys[i] = r.getAttribute('y') || '';
+        widths[i] = r.getAttribute('width') || '';
+    }
+    return {kind: 'nowcast', viewBox: vb, heights: heights, fills: fills, xs: xs, ys: ys, widths: widths};
+}
+
+// Fallback: div[jsname="Kt2ahd"].XhUg9e with the two summary divs
+const div = document.querySelector('div[jsname="Kt2ahd"].XhUg9e');
+if (div) {
+    const div1 = div.querySelector('.SnOHQb.tNxQIb');
+    const div2 = div.querySelector('.jz8NAf.ApHyTb');
+    if (div1 || div2) {
+        return {kind: 'fallback', data: {
+            div1_text: div1 ? div1.textContent.trim() : null,
+            div2_text: div2 ? div2.textContent.trim() : null
+        }};
+    }
+}
+
+// Third fallback: first six hourly forecast aria-labels
+const container = document.querySelector('[jsname="s2gQvd"].EDblX.HG5ZQb');
+if (!container) return {kind: 'none', reason: 'no_hourly_container'};
+const items = container.querySelectorAll('[role="listitem"][aria-label]');
+if (!items.length) return {kind: 'none', reason: 'no_hourly_items'};
+const labels = [];
+for (let i = 0; i < Math.min(6, items.length); i++) {
+    const ariaLabel = items[i].getAttribute('aria-label');
+    if (ariaLabel) labels.push(ariaLabel);
+}
+if (!labels.length) return {kind: 'none', reason: 'no_hourly_items'};
+return {kind: 'hourly', count: labels.length, labels: labels};
+"""
+
+
+# Resolved chromedriver path, shared by every driver this process starts
+_DRIVER_PATH: str | None = None
+_DRIVER_PATH_LOCK = threading.Lock()
+
+
+def _driver_binary() -> str:
+    """Resolve the chromedriver binary once per process (install() stats disk and may hit the network)."""
+    global _DRIVER_PATH
+    with _DRIVER_PATH_LOCK:
+        if _DRIVER_PATH is None:
+            from webdriver_manager.chrome import ChromeDriverManager
+            _DRIVER_PATH = ChromeDriverManager().install()
+        return _DRIVER_PATH
+
 
 def _chrome_driver(headless: bool = True):
     from selenium import webdriver
-    from webdriver_manager.chrome import ChromeDriverManager
     from selenium.webdriver.chrome.service import Service
 
     options = webdriver.ChromeOptions()
@@ -102,7 +188,7 @@ def _chrome_driver(headless: bool = True):
         "user-agent=Mozilla/5.0 (Linux; Android 10; SM-G973F) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36"
     )
 
-    service = Service(ChromeDriverManager().install())
+    service = Service(_driver_binary())
     return webdriver.Chrome(service=service, options=options)
 
 
@@ -127,6 +213,133 @@ def _accept_consent(driver):
         pass
 
 
+def _dump_json(obj) -> bytes:
+    """Serialize to indented UTF-8 JSON; orjson when available, else the stdlib."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def _dump_json_line(obj) -> str:
+    """One compact NDJSON line (trailing newline included)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE).decode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+# Output directories already created by this process (all cities of a run share one)
+_MKDIR_CACHE = set()
+
+
+def _ensure_dir(path: Path):
+    key = str(path)
+    if key not in _MKDIR_CACHE:
+        path.mkdir(parents=True, exist_ok=True)
+        _MKDIR_CACHE.add(key)
+
+
+def _save_html_snapshot(driver, base_dir: Path, city, city_id, folder_date):
+    """Write the current page source to GoogleNowcastHTML/<folder_date>/<city_id>_<folder_date>.html."""
+    try:
+        html_dir = base_dir / "GoogleNowcastHTML" / folder_date
+        _ensure_dir(html_dir)
+        html_filename = f"{city_id}_{folder_date}.html"
+        (html_dir / html_filename).write_text(driver.page_source, encoding="utf-8")
+        print(f"[{city}] Saved HTML: {html_filename}")
+    except Exception as e:
+        print(f"[{city}] Warning: Could not save HTML: {e}")
+
+
+def _driver_alive(driver) -> bool:
+    try:
+        driver.current_url
+        return True
+    except Exception:
+        return False
+
+
+class ChromeDriverPool:
+    """Bounded pool of Chrome drivers shared by the worker threads of a run.
+
+    Drivers are started lazily (at most size of them), pass the consent page
+    once, and are handed back after every city instead of being quit. Cookies
+    are kept between cities so the consent cookie stays valid.
+    """
+
+    def __init__(self, size, headless=True):
+        self.size = size
+        self.headless = headless
+        self._q = queue.Queue()
+        self._drivers = []
+        self._slots = 0  # drivers started or starting
+        self._lock = threading.Lock()
+
+    def _new_driver(self):
+        driver = _chrome_driver(headless=self.headless)
+        try:
+            driver.get("https://www.google.com/ncr?hl=en&gl=us")
+            _accept_consent(driver)
+        except Exception:
+            driver.quit()
+            raise
+        return driver
+
+    @contextmanager
+    def checkout(self):
+        try:
+            driver = self._q.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._slots < self.size
+                if create:
+                    self._slots += 1  # reserve the slot before the slow start
+            if create:
+                try:
+                    driver = self._new_driver()
+                except Exception:
+                    with self._lock:
+                        self._slots -= 1
+                    raise
+                with self._lock:
+                    self._drivers.append(driver)
+            else:
+                driver = self._q.get()
+        try:
+            yield driver
+        finally:
+            with self._lock:
+                keep = driver in self._drivers
+            if keep:
+                self._q.put(driver)
+
+    def discard(self, driver):
+        """Quit a broken driver; its slot is refilled by the next checkout."""
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+                self._slots -= 1
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def shutdown(self):
+        with self._lock:
+            drivers = list(self._drivers)
+            self._drivers.clear()
+            self._slots = 0
+        while True:
+            try:
+                self._q.get_nowait()
+            except queue.Empty:
+                break
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
 def scrape_nowcast_svg(
     city: str = "Fairfax, California, United States",
     city_id: str = "",
@@ -134,8 +347,16 @@ def scrape_nowcast_svg(
     save_json: bool = True,
     output_dir: str | Path | None = None,
     first_scrape_date: str | None = None,
+    driver=None,
+    save_html: bool = False,
 ):
-    """Scrape rect heights from the SVG whose viewBox includes 1440 and 48."""
+    """Scrape rect heights from the SVG whose viewBox includes 1440 and 48.
+
+    If driver is given (e.g. from ChromeDriverPool) it is reused with consent
+    already handled and left open; otherwise a fresh browser is started.
+    The page source is saved to GoogleNowcastHTML only when no data was found,
+    or for every city with save_html.
+    """
     try:
         from selenium.webdriver.common.by import By
         from selenium.webdriver.support.ui import WebDriverWait
@@ -145,6 +366,7 @@ def scrape_nowcast_svg(
         return None
 
     base_dir = Path(output_dir) if output_dir else Path(__file__).parent
+    folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
 
     out = {
         "city": city,
@@ -155,199 +377,123 @@ def scrape_nowcast_svg(
         "points": []
     }
 
-    driver = _chrome_driver(headless=headless)
+    own_driver = driver is None
+    if own_driver:
+        driver = _chrome_driver(headless=headless)
     try:
-        driver.get("https://www.google.com/ncr?hl=en&gl=us")
-        _accept_consent(driver)
+        if own_driver:
+            driver.get("https://www.google.com/ncr?hl=en&gl=us")
+            _accept_consent(driver)
 
         from urllib.parse import quote_plus
         q = quote_plus(f"weather {city}")
         driver.get(f"https://www.google.com/search?q={q}&hl=en&gl=us")
 
-        time.sleep(3)
-        
-        # Save HTML page
+        # Continue as soon as the nowcast SVG, the fallback div, the hourly list or
+        # Google's captcha form is in the DOM (5 s cap instead of a fixed 3 s sleep)
         try:
-            html_content = driver.page_source
-            folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
-            html_dir = base_dir / "GoogleNowcastHTML" / folder_date
-            html_dir.mkdir(parents=True, exist_ok=True)
-            html_filename = f"{city_id}_{folder_date}.html"
-            html_path = html_dir / html_filename
-            html_path.write_text(html_content, encoding="utf-8")
-            print(f"[{city}] Saved HTML: {html_filename}")
-        except Exception as e:
-            print(f"[{city}] Warning: Could not save HTML: {e}")
+            WebDriverWait(driver, 5).until(EC.any_of(*(
+                EC.presence_of_element_located((By.CSS_SELECTOR, selector))
+                for selector in PAGE_READY_SELECTORS
+            )))
+        except Exception:
+            time.sleep(0.5)  # Timed out: short grace period, then let the probes report what is missing
         
-        # Check for reCAPTCHA robot verification
-        check_robot_js = """
-        const pageText = document.body.innerText;
-        const hasRobotCheck = pageText.includes("I'm not a robot") || pageText.includes("unusual traffic");
-        return hasRobotCheck;
-        """
-        is_robot_check = driver.execute_script(check_robot_js)
-        if is_robot_check:
+        # One round-trip: robot check, target SVG, fallback div and hourly probe
+        result = driver.execute_script(EXTRACT_JS) or {"kind": "none", "reason": "unknown"}
+        kind = result.get("kind")
+
+        # page_source ships the whole DOM (several MB): keep it only for pages without data
+        if save_html or kind == "none":
+            _save_html_snapshot(driver, base_dir, city, city_id, folder_date)
+        if kind == "robot":
             print("⚠ reCAPTCHA verification detected: 'I'm not a robot'")
             out["type"] = "robot"
             if save_json:
-                folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
                 file_timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
                 outdir = base_dir / "Crawled" / folder_date
-                outdir.mkdir(parents=True, exist_ok=True)
+                _ensure_dir(outdir)
                 fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
-                fname.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
+                fname.write_bytes(_dump_json(out))
                 print("Saved:", fname)
             return out
 
-        js = """
-        const all = document.querySelectorAll('svg');
-        const withRects = [];
-        for (const svg of all) {
-            const rects = svg.querySelectorAll('rect');
-            if (rects.length) {
-                withRects.push({svg, viewBox: svg.getAttribute('viewBox'), rectCount: rects.length});
-            }
-        }
-        let target = null;
-        for (const info of withRects) {
-            const vb = (info.viewBox || "");
-            if (vb.includes('1440') && vb.includes('48')) { target = info; break; }
-        }
-        if (!target) {
-            return {found:false, sample: withRects.slice(0, 10)};
-        }
-        const rects = target.svg.querySelectorAll('rect');
-        const rows = [];
-        for (let i=0;i<rects.length;i++){
-            const r = rects[i];
-            rows.push({
-                idx:i,
-                height: r.getAttribute('height')||'',
-                fill: r.getAttribute('fill')||'',
-                x: r.getAttribute('x')||'',
-                y: r.getAttribute('y')||'',
-                width: r.getAttribute('width')||''
-            });
-        }
-        return {found:true, viewBox: target.viewBox, rects: rows};
-        """
-
-        result = driver.execute_script(js)
-        if not result or not result.get("found"):
+        if kind != "nowcast":
             print(f"[{city}] No target SVG found. Trying fallback div...")
-            fallback_js = """
-            const div = document.querySelector('div[jsname="Kt2ahd"].XhUg9e');
-            if (!div) return {found: false, reason: 'no_kt2ahd_div'};
-            const div1 = div.querySelector('.SnOHQb.tNxQIb');
-            const div2 = div.querySelector('.jz8NAf.ApHyTb');
-            if (!div1 && !div2) return {found: false, reason: 'no_target_divs'};
-            const data = {
-                div1_text: div1 ? div1.textContent.trim() : null,
-                div2_text: div2 ? div2.textContent.trim() : null
-            };
-            return {found: true, source: 'fallback_div', data: data};
-            """
-            
-            fallback_result = driver.execute_script(fallback_js)
-            if fallback_result and fallback_result.get("found"):
-                print(f"[{city}] Fallback OK: found divs")
-                out["fallback_data"] = fallback_result.get("data")
-                out["source"] = "fallback_div"
-                out["type"] = "nowcast"
-                result = {"viewBox": None, "rects": []}
+        if kind == "fallback":
+            print(f"[{city}] Fallback OK: found divs")
+            out["fallback_data"] = result.get("data")
+            out["source"] = "fallback_div"
+            out["type"] = "nowcast"
+            result = {"viewBox": None}
+        elif kind != "nowcast":
+            print(f"[{city}] Fallback div not found. Trying hourly forecast...")
+            if kind == "hourly":
+                print(f"[{city}] Hourly forecast OK: {result.get('count', 0)} items")
+                out["hourly_data"] = result.get("labels", [])
+                out["source"] = "hourly_aria_label"
+                out["type"] = "hourly"
+                result = {"viewBox": None}
             else:
-                print(f"[{city}] Fallback div not found. Trying hourly forecast...")
-                hourly_js = """
-                const container = document.querySelector('[jsname="s2gQvd"].EDblX.HG5ZQb');
-                if (!container) return { found: false, reason: 'no_hourly_container' };
-                const items = container.querySelectorAll('[role="listitem"][aria-label]');
-                if (!items || items.length === 0) {
-                    return { found: false, reason: 'no_hourly_items' };
-                }
-                const labels = [];
-                for (let i = 0; i < Math.min(6, items.length); i++) {
-                    const ariaLabel = items[i].getAttribute('aria-label');
-                    if (ariaLabel) labels.push(ariaLabel);
-                }
-                return { found: labels.length > 0, count: labels.length, labels: labels };
-                """
-                
-                hourly_result = driver.execute_script(hourly_js)
-                if hourly_result and hourly_result.get("found"):
-                    print(f"[{city}] Hourly forecast OK: {hourly_result.get('count', 0)} items")
-                    out["hourly_data"] = hourly_result.get("labels", [])
-                    out["source"] = "hourly_aria_label"
-                    out["type"] = "hourly"
-                    result = {"viewBox": None, "rects": []}
-                else:
-                    html = driver.page_source
-                    dbg = base_dir / f"debug_nowcast_{city.split(',')[0].replace(' ', '_')}.html"
-                    dbg.write_text(html, encoding="utf-8")
-                    reason = hourly_result.get('reason') if hourly_result else 'unknown'
-                    print(f"[{city}] No data found (reason: {reason}). Wrote {dbg.name}")
-                    # Delete debug file after saving
-                    try:
-                        import time as time_module
-                        time_module.sleep(0.5)  # Brief delay to ensure file is written
-                        dbg.unlink()  # Delete the file
-                        print(f"[{city}] Debug file deleted: {dbg.name}")
-                    except Exception as del_err:
-                        print(f"[{city}] Could not delete debug file: {del_err}")
-                    out["message"] = "no nowcast data now."
-                    if save_json:
-                        folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
-                        file_timestamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
-                        outdir = base_dir / "Crawled" / folder_date
-                        outdir.mkdir(parents=True, exist_ok=True)
-                        fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
-                        fname.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
-                    return out
+                reason = result.get('reason', 'unknown')
+                print(f"[{city}] No data found (reason: {reason}).")
+                out["message"] = "no nowcast data now."
+                if save_json:
+                    file_timestamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+                    outdir = base_dir / "Crawled" / folder_date
+                    _ensure_dir(outdir)
+                    fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
+                    fname.write_bytes(_dump_json(out))
+                return out
 
         out["viewBox"] = result.get("viewBox")
         if result.get("source"):
             out["source"] = result.get("source")
         if not out["type"]:
             out["type"] = "nowcast"
-        rows = result.get("rects") or []
         start = datetime.fromisoformat(out["scrape_time"])
         # If minute is odd, subtract 1 minute to make it even
         if start.minute % 2 == 1:
             start = start - timedelta(minutes=1)
-        for row in rows:
-            t = start + timedelta(minutes=int(row.get("idx", 0)) * 2)
+        columns = zip(
+            result.get("heights") or (),
+            result.get("fills") or (),
+            result.get("xs") or (),
+            result.get("ys") or (),
+            result.get("widths") or (),
+        )
+        for idx, (height, fill, x, y, width) in enumerate(columns):
+            t = start + timedelta(minutes=idx * 2)
             out["points"].append({
-                "minute_index": int(row.get("idx", 0)),
+                "minute_index": idx,
                 "time": t.strftime("%Y-%m-%d %H:%M"),
-                "height": row.get("height"),
-                "fill": row.get("fill"),
-                "x": row.get("x"),
-                "y": row.get("y"),
-                "width": row.get("width")
+                "height": height,
+                "fill": fill,
+                "x": x,
+                "y": y,
+                "width": width
             })
 
         if save_json and out["points"]:
-            folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
             file_timestamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
             outdir = base_dir / "Crawled" / folder_date
-            outdir.mkdir(parents=True, exist_ok=True)
+            _ensure_dir(outdir)
             fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
-            fname.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
+            fname.write_bytes(_dump_json(out))
             print(f"[{city}] Saved: {fname.name}")
         elif save_json and out.get("fallback_data"):
-            folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
             file_timestamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
             outdir = base_dir / "Crawled" / folder_date
-            outdir.mkdir(parents=True, exist_ok=True)
+            _ensure_dir(outdir)
             fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
-            fname.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
+            fname.write_bytes(_dump_json(out))
             print(f"[{city}] Saved: {fname.name}")
         elif save_json and out.get("hourly_data"):
-            folder_date = first_scrape_date if first_scrape_date else datetime.now(timezone.utc).strftime("%Y%m%d%H")
             file_timestamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
             outdir = base_dir / "Crawled" / folder_date
-            outdir.mkdir(parents=True, exist_ok=True)
+            _ensure_dir(outdir)
             fname = outdir / f"nowcast_{city_id}_{file_timestamp}.json"
-            fname.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
+            fname.write_bytes(_dump_json(out))
             print(f"[{city}] Saved: {fname.name}")
 
         return out
@@ -356,28 +502,36 @@ def scrape_nowcast_svg(
         print(f"ERR [{city}]:", e)
         return None
     finally:
-        try:
-            driver.quit()
-        except Exception:
-            pass
+        if own_driver:
+            try:
+                driver.quit()
+            except Exception:
+                pass
 
 
 # Thread-safe counter for progress tracking
 class ProgressTracker:
     def __init__(self, total):
         self.total = total
-        self.completed = 0
-        self.lock = threading.Lock()
-    
+        # count.__next__ is a single C call, atomic under the GIL; free-threaded
+        # builds (sys._is_gil_enabled() is False) still need the lock
+        self._counter = itertools.count(1)
+        self._lock = None if getattr(sys, "_is_gil_enabled", lambda: True)() else threading.Lock()
+
     def increment(self):
-        with self.lock:
-            self.completed += 1
-            return self.completed
+        if self._lock is None:
+            return next(self._counter)
+        with self._lock:
+            return next(self._counter)
 
 
-def scrape_city_wrapper(city, city_id, headless, output_root, tracker, first_scrape_date):
+def scrape_city_wrapper(city, city_id, pool, output_root, tracker, first_scrape_date, save_json=True, save_html=False):
     """Wrapper function for concurrent scraping."""
-    result = scrape_nowcast_svg(city, city_id=city_id, headless=headless, save_json=True, output_dir=output_root, first_scrape_date=first_scrape_date)
+    with pool.checkout() as driver:
+        result = scrape_nowcast_svg(city, city_id=city_id, headless=pool.headless, save_json=save_json, output_dir=output_root, first_scrape_date=first_scrape_date, driver=driver, save_html=save_html)
+        if result is None and not _driver_alive(driver):
+            # 浏览器崩溃或会话失效，丢弃后由下一个城市重新创建
+            pool.discard(driver)
     completed = tracker.increment()
     
     if result and result.get("points"):
@@ -392,13 +546,16 @@ def scrape_city_wrapper(city, city_id, headless, output_root, tracker, first_scr
     return city, result
 
 
-def scrape_all_cities_concurrent(base_dir, csv_file='nowcast_crawl_list_v3.csv', max_workers=5):
+def scrape_all_cities_concurrent(base_dir, csv_file='nowcast_crawl_list_v3.csv', max_workers=5, save_per_city=True, save_html=False):
     """并发爬取所有城市的气象数据
     
     Args:
         base_dir: 输出目录的基础路径
         csv_file: CSV 文件路径，默认为 'nowcast_crawl_list_v3.csv'
         max_workers: 最大并发线程数，默认5个
+        save_per_city: 默认每个城市写一个 JSON（统计/分析脚本读取这些文件）；
+            False 时所有结果由主线程追加到一个 Crawled/<folder_date>/nowcast_<folder_date>.ndjson
+        save_html: True 时保存每个城市的网页源码；默认只保存没有找到数据的页面
     """
     df = pd.read_csv(csv_file)
     name_list = df['name'].tolist()
@@ -415,23 +572,38 @@ def scrape_all_cities_concurrent(base_dir, csv_file='nowcast_crawl_list_v3.csv',
     tracker = ProgressTracker(len(name_list))
     results = {}
     
-    # Use ThreadPoolExecutor for concurrent scraping
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all tasks
-        future_to_city = {
-            executor.submit(scrape_city_wrapper, city, city_id, False, output_root, tracker, first_scrape_date): (city, city_id)
-            for city, city_id in zip(name_list, id_list)
-        }
-        
-        # Process completed tasks
-        for future in as_completed(future_to_city):
-            city, city_id = future_to_city[future]
-            try:
-                city_name, result = future.result()
-                results[city_name] = result
-            except Exception as e:
-                print(f"✗ Exception for {city_id}: {e}")
-                results[city] = None
+    # 浏览器池在整个任务中复用（每个线程一个浏览器），结束后全部关闭
+    pool = ChromeDriverPool(max_workers, headless=False)
+    ndjson_file = None
+    if not save_per_city:
+        ndjson_dir = output_root / "Crawled" / first_scrape_date
+        _ensure_dir(ndjson_dir)
+        ndjson_file = open(ndjson_dir / f"nowcast_{first_scrape_date}.ndjson", "a", encoding="utf-8")
+    try:
+        # Use ThreadPoolExecutor for concurrent scraping
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Submit all tasks
+            future_to_city = {
+                executor.submit(scrape_city_wrapper, city, city_id, pool, output_root, tracker, first_scrape_date, save_per_city, save_html): (city, city_id)
+                for city, city_id in zip(name_list, id_list)
+            }
+            
+            # Process completed tasks
+            for future in as_completed(future_to_city):
+                city, city_id = future_to_city[future]
+                try:
+                    city_name, result = future.result()
+                    results[city_name] = result
+                    if ndjson_file is not None and result:
+                        ndjson_file.write(_dump_json_line(result))
+                except Exception as e:
+                    print(f"✗ Exception for {city_id}: {e}")
+                    results[city] = None
+    finally:
+        pool.shutdown()
+        if ndjson_file is not None:
+            ndjson_file.close()
+            print(f"Saved: {Path(ndjson_file.name).name}")
     
     print(f"\n{'='*60}")
     print(f"爬取任务完成 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -0,0 +1,212 @@
+"""Shared per-file scan of a Crawled/<date> folder, cached on disk.
+
+Every JSON file is reduced to a small record:
+    {"valid": bool, "type": str | None, "is_no_data": bool, "has_robot": bool}
+
+Records are pickled to <folder>/.scan_cache.pkl keyed by file name and
+validated against (st_mtime_ns, st_size), so re-running the statistics
+scripts over an unchanged folder only costs one stat() per file.
+
+load_timeline() adds the filename timestamp parsing and time sort shared
+by the analyze_robot* scripts.
+"""
+import json
+import mmap
+import os
+import pickle
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from operator import itemgetter
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+CACHE_NAME = ".scan_cache.pkl"
+CACHE_VERSION = 2
+SCAN_WORKERS = 32  # 并发读取文件的线程数
+MMAP_THRESHOLD = 64 * 1024  # 超过64KB的文件改用mmap扫描
+TYPE_HEAD = 4 * 1024  # 爬虫输出中type是第4个键，只在文件头部查找
+
+ROBOT_MARKER = b'robot'  # 与 lower() 后的内容比较，覆盖所有大小写组合（比 IGNORECASE 正则快约4倍）
+NO_DATA_MARKER = b'"no nowcast data now."'
+TYPE_RE = re.compile(rb'"type"\s*:\s*(?:"([^"]*)"|null)')
+
+# 文件名时间戳: 8位日期_6位时间 或 14位连续时间戳
+TS_RE_SPLIT = re.compile(r'(\d{8})_(\d{6})')
+TS_RE_JOINED = re.compile(r'(\d{14})')
+
+
+def _build_record(buf):
+    """Build a record from a bytes or mmap buffer (both support find/regex)."""
+    m = TYPE_RE.search(buf, 0, TYPE_HEAD)
+    if m:
+        valid = True
+        type_val = m.group(1).decode('utf-8') if m.group(1) is not None else None
+    else:
+        # 头部匹配不到type时才完整解析JSON
+        try:
+            valid, type_val = True, json_loads(buf[:]).get('type')
+        except Exception:
+            valid, type_val = False, None
+    return {
+        "valid": valid,
+        "type": type_val,
+        "is_no_data": buf.find(NO_DATA_MARKER) != -1,
+        "has_robot": ROBOT_MARKER in buf[:].lower(),  # bytes 切片不复制；mmap 切片读出内容
+    }
+
+
+def scan_file(filepath):
+    """Read one file as raw bytes and build its record (no decode, no lower() copy)."""
+    with open(filepath, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size > MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return _build_record(mm)
+        return _build_record(f.read())
+
+
+def _empty_record():
+    return {"valid": False, "type": None, "is_no_data": False, "has_robot": False}
+
+
+def _safe_scan(filepath):
+    try:
+        return scan_file(filepath)
+    except OSError:
+        return _empty_record()
+
+
+def _load_cache(cache_path):
+    try:
+        with open(cache_path, 'rb') as f:
+            cache = pickle.load(f)
+    except Exception:
+        return {}
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        return {}
+    return cache.get("entries", {})
+
+
+def _save_cache(cache_path, entries):
+    tmp_path = cache_path + ".tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({"version": CACHE_VERSION, "entries": entries}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Warning: Could not write scan cache {cache_path}: {e}")
+
+
+def list_json(folder):
+    """List the *.json files in folder as os.DirEntry objects.
+
+    scandir yields name, full path and (cached) stat information in one
+    pass, so callers need neither os.path.join nor a separate stat().
+    """
+    with os.scandir(folder) as it:
+        return [entry for entry in it if entry.name.endswith('.json')]
+
+
+def scan_files(folder, entries):
+    """Return {name: record} for the given os.DirEntry objects inside folder.
+
+    Unchanged files are served from the on-disk cache; the rest are read
+    concurrently and the cache is rewritten only if anything changed.
+    """
+    cache_path = os.path.join(os.fspath(folder), CACHE_NAME)
+    cache = _load_cache(cache_path)
+
+    records = {}
+    misses = []
+    for entry in entries:
+        try:
+            st = entry.stat()
+        except OSError:
+            records[entry.name] = _empty_record()
+            continue
+        key = (st.st_mtime_ns, st.st_size)
+        cached = cache.get(entry.name)
+        if cached is not None and cached[0] == key:
+            records[entry.name] = cached[1]
+        else:
+            misses.append((entry.name, entry.path, key))
+
+    if misses:
+        with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+            scanned = executor.map(_safe_scan, [path for _, path, _ in misses])
+            for (name, _, key), record in zip(misses, scanned):
+                records[name] = record
+                cache[name] = (key, record)
+        _save_cache(cache_path, cache)
+
+    return records
+
+
+def _parse_digits(digits):
+    """Build a datetime from 14 YYYYMMDDHHMMSS digits (no strptime)."""
+    return datetime(int(digits[0:4]), int(digits[4:6]), int(digits[6:8]),
+                    int(digits[8:10]), int(digits[10:12]), int(digits[12:14]))
+
+
+def _make_parser(date):
+    """Return filename -> datetime | None.
+
+    With date ('YYYYMMDD') only names containing that date are accepted and
+    the six digits after it (optionally '_'-separated) give the time of day;
+    without it the first YYYYMMDD_HHMMSS or YYYYMMDDHHMMSS in the name is used.
+    """
+    if date:
+        ts_re = re.compile(re.escape(date) + r'[_]?(\d{6})')
+
+        def parse(filename):
+            if date not in filename:
+                return None
+            match = ts_re.search(filename)
+            if match:
+                try:
+                    return _parse_digits(date + match.group(1))
+                except ValueError:
+                    pass
+            return None
+        return parse
+
+    def parse(filename):
+        match = TS_RE_SPLIT.search(filename)
+        if match:
+            try:
+                return _parse_digits(match.group(1) + match.group(2))
+            except ValueError:
+                pass
+        match = TS_RE_JOINED.search(filename)
+        if match:
+            try:
+                return _parse_digits(match.group(1))
+            except ValueError:
+                pass
+        return None
+    return parse
+
+
+def load_timeline(folder, date=None):
+    """List, time-stamp, sort and scan the JSON files of folder in one call.
+
+    Returns (file_data, records): file_data is [(filename, timestamp)] sorted
+    by timestamp (files without a parsable timestamp are dropped) and records
+    is the {filename: record} mapping from scan_files for those files.
+    """
+    parse = _make_parser(date)
+    entries = {}
+    file_data = []
+    for entry in list_json(folder):
+        timestamp = parse(entry.name)
+        if timestamp:
+            entries[entry.name] = entry
+            file_data.append((entry.name, timestamp))
+    file_data.sort(key=itemgetter(1))
+    records = scan_files(folder, [entries[filename] for filename, _ in file_data])
+    return file_data, records